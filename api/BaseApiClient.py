@@ -1,22 +1,159 @@
+import random
+import threading
+import time
+from dataclasses import replace
+from email.utils import parsedate_to_datetime
+from typing import Optional
 from urllib.parse import urlencode, urljoin
 
 import requests
 from requests import Response
+from requests.adapters import HTTPAdapter
+
+from model.RestCallStats import RestCallStats
 
 
 class BaseApiClient:
+    __RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+    # a POST that failed after the server accepted it would be sent twice, so it is only retried on 429
+    __IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+    __MAX_RETRY_AFTER_SECONDS = 60.0
+    __pool_size = 10
+    __max_retries = 3
+    __backoff_factor = 0.5
+    # (connect, read) seconds, the read timeout also applies to each wait between chunks of a stream
+    __timeout: tuple[float, float] = (10.0, 60.0)
+    __session: Optional[requests.Session] = None
+    __stats = RestCallStats()
+    __lock = threading.Lock()
+
+    @staticmethod
+    def configure_session(
+        *,
+        pool_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_factor: Optional[float] = None,
+        timeout: Optional[tuple[float, float]] = None,
+    ) -> None:
+        """
+        Configure the HTTP session shared by all API clients.
+        The session is rebuilt on the next REST call.
+        """
+        with BaseApiClient.__lock:
+            if pool_size is not None:
+                BaseApiClient.__pool_size = pool_size
+            if max_retries is not None:
+                BaseApiClient.__max_retries = max_retries
+            if backoff_factor is not None:
+                BaseApiClient.__backoff_factor = backoff_factor
+            if timeout is not None:
+                BaseApiClient.__timeout = timeout
+            if BaseApiClient.__session is not None:
+                BaseApiClient.__session.close()
+                BaseApiClient.__session = None
+
+    @staticmethod
+    def get_stats() -> RestCallStats:
+        """
+        Returns a snapshot of the latency and retry counts of all REST calls made since the last reset_stats.
+        """
+        with BaseApiClient.__lock:
+            return replace(BaseApiClient.__stats)
+
+    @staticmethod
+    def reset_stats() -> None:
+        with BaseApiClient.__lock:
+            BaseApiClient.__stats = RestCallStats()
+
     @staticmethod
-    def _rest_call(rest_call: callable, *args, **kwargs) -> Response:
+    def _get_session() -> requests.Session:
+        """
+        Returns the pooled keep-alive session shared by all API clients.
+        """
+        with BaseApiClient.__lock:
+            if BaseApiClient.__session is None:
+                adapter = HTTPAdapter(
+                    pool_connections=BaseApiClient.__pool_size,
+                    pool_maxsize=BaseApiClient.__pool_size,
+                )
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                BaseApiClient.__session = session
+            return BaseApiClient.__session
+
+    @staticmethod
+    def _rest_call(method: str, url: str, **kwargs) -> Response:
         """
         Make a general REST call and handle exceptions.
+        Retries 429s with exponential backoff and jitter, and also connection errors, timeouts and 5xxs for idempotent methods.
+        """
+        session = BaseApiClient._get_session()
+        max_retries = BaseApiClient.__max_retries
+        kwargs.setdefault("timeout", BaseApiClient.__timeout)
+        is_idempotent = method.upper() in BaseApiClient.__IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = session.request(method, url, **kwargs)
+                latency = time.perf_counter() - start
+                retryable = response.status_code == 429 or (
+                    is_idempotent and response.status_code in BaseApiClient.__RETRY_STATUS_CODES
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                latency = time.perf_counter() - start
+                response = None
+                retryable = is_idempotent
+                error = e
+            BaseApiClient.__record_call(latency)
+
+            if retryable and attempt < max_retries:
+                delay = BaseApiClient.__get_retry_delay(response, attempt)
+                print(f"RETRYING REST CALL IN {delay:.2f}s ({attempt + 1}/{max_retries})...")
+                if response is not None:
+                    response.close()
+                with BaseApiClient.__lock:
+                    BaseApiClient.__stats.retries += 1
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            try:
+                if response is None:
+                    raise error
+                response.raise_for_status()
+                return response
+            except requests.RequestException as e:
+                with BaseApiClient.__lock:
+                    BaseApiClient.__stats.failures += 1
+                print(f"Error during REST call: {e}")
+                raise e
+
+    @staticmethod
+    def __record_call(latency: float) -> None:
+        with BaseApiClient.__lock:
+            BaseApiClient.__stats.calls += 1
+            BaseApiClient.__stats.total_latency_seconds += latency
+            BaseApiClient.__stats.last_latency_seconds = latency
+
+    @staticmethod
+    def __get_retry_delay(response: Optional[Response], attempt: int) -> float:
+        """
+        Honors the Retry-After header if present (up to a minute), otherwise uses exponential backoff with full jitter.
         """
-        try:
-            response = rest_call(*args, **kwargs)
-            response.raise_for_status()
-            return response
-        except requests.RequestException as e:
-            print(f"Error during REST call: {e}")
-            raise e
+        if response is not None and response.headers.get("Retry-After") is not None:
+            retry_after = response.headers["Retry-After"]
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return min(max(delay, 0.0), BaseApiClient.__MAX_RETRY_AFTER_SECONDS)
+        return random.uniform(0, BaseApiClient.__backoff_factor * (2**attempt))
 
     @staticmethod
     def _build_url_with_params(base_url: str, query_params: dict[str, any]) -> str:
@@ -1,8 +1,6 @@
 import json
 from typing import Optional
 
-import requests
-
 from api.BaseApiClient import BaseApiClient
 
 
@@ -20,15 +18,17 @@ class DiscordApiClient(BaseApiClient):
         - file_path (Optional[str]): The path to the file to attach (default is None).
         """
         if file_path:
+            # read the file up front so the payload can be resent if the call is retried
             with open(file_path, "rb") as file:
-                # Set the image in the last embed's image url field
-                embeds[-1]["image"] = {"url": f"attachment://{file_path.split('/')[-1]}"}
+                file_content = file.read()
+            # Set the image in the last embed's image url field
+            embeds[-1]["image"] = {"url": f"attachment://{file_path.split('/')[-1]}"}
 
-                payload = {
-                    "payload_json": (None, json.dumps({"embeds": embeds})),
-                    "file": (file_path.split("/")[-1], file),
-                }
-                cls._rest_call(requests.post, url, files=payload)
+            payload = {
+                "payload_json": (None, json.dumps({"embeds": embeds})),
+                "file": (file_path.split("/")[-1], file_content),
+            }
+            cls._rest_call("POST", url, files=payload)
         else:
             data = {"embeds": embeds}
-            cls._rest_call(requests.post, url, json=data)
+            cls._rest_call("POST", url, json=data)
@@ -1,26 +1,25 @@
-import json
-from typing import Optional
-
-import requests
+from typing import Iterator, Optional
 
 from api.BaseApiClient import BaseApiClient
 from enumeration.PerfType import PerfType
 from enumeration.Sort import Sort
 from model.ChessGame import ChessGame
 from model.ChessGameV2 import ChessGameV2
+from util import json_backend
 
 
 class LichessApiClient(BaseApiClient):
-    __BASE_URL = "https://lichess.org/api"
+    __DEFAULT_BASE_URL = "https://lichess.org/api"
     __GAMES_ROUTE = "/games"
     __USER_ROUTE = "/user"
 
-    def __init__(self):
+    def __init__(self, *, base_url: Optional[str] = None):
         super().__init__()
+        # allows pointing the client at a stand-in server
+        self.__base_url = base_url if base_url is not None else self.__DEFAULT_BASE_URL
 
-    @classmethod
     def get_games_for_user(
-        cls,
+        self,
         username: str,
         *,
         max: Optional[int] = None,
@@ -33,7 +32,7 @@ class LichessApiClient(BaseApiClient):
         literate: Optional[bool] = None,
     ) -> list[ChessGame]:
         ...
-        url = f"{cls.__BASE_URL}{cls.__GAMES_ROUTE}{cls.__USER_ROUTE}/{username}"
+        url = f"{self.__base_url}{self.__GAMES_ROUTE}{self.__USER_ROUTE}/{username}"
 
         params = {}
         if max is not None:
@@ -53,9 +52,9 @@ class LichessApiClient(BaseApiClient):
         if literate is not None:
             params["literate"] = literate
 
-        url = cls._build_url_with_params(url, params)
+        url = self._build_url_with_params(url, params)
 
-        response = cls._rest_call(requests.get, url)
+        response = self._rest_call("GET", url)
 
         games_list = []
         games_text = response.text.strip().split("\n\n\n")
@@ -63,9 +62,8 @@ class LichessApiClient(BaseApiClient):
             games_list.append(ChessGame.from_text(game_text))
         return games_list
 
-    @classmethod
     def get_games_for_user_v2(
-        cls,
+        self,
         username: str,
         *,
         max: Optional[int] = None,
@@ -77,10 +75,87 @@ class LichessApiClient(BaseApiClient):
         finished: Optional[bool] = None,
         literate: Optional[bool] = None,
         last_fen: Optional[bool] = None,
+        evals: Optional[bool] = None,
+        since: Optional[int] = None,
+        lazy: bool = False,
     ) -> list[ChessGameV2]:
+        return list(
+            self.stream_games_for_user_v2(
+                username,
+                max=max,
+                rated=rated,
+                perf_type=perf_type,
+                tags=tags,
+                sort=sort,
+                opening=opening,
+                finished=finished,
+                literate=literate,
+                last_fen=last_fen,
+                evals=evals,
+                since=since,
+                lazy=lazy,
+            )
+        )
+
+    def stream_games_for_user_v2(
+        self,
+        username: str,
+        *,
+        max: Optional[int] = None,
+        rated: Optional[bool] = None,
+        perf_type: Optional[PerfType] = None,
+        tags: Optional[bool] = None,
+        sort: Optional[Sort] = None,
+        opening: Optional[bool] = None,
+        finished: Optional[bool] = None,
+        literate: Optional[bool] = None,
+        last_fen: Optional[bool] = None,
+        evals: Optional[bool] = None,
+        since: Optional[int] = None,
+        lazy: bool = False,
+    ) -> Iterator[ChessGameV2]:
+        """
+        Yields each game as soon as its line of the NDJSON response arrives.
+        If lazy is True, each game's fields are only decoded when first accessed.
+        """
+        for game_dict in self.stream_game_dicts_for_user_v2(
+            username,
+            max=max,
+            rated=rated,
+            perf_type=perf_type,
+            tags=tags,
+            sort=sort,
+            opening=opening,
+            finished=finished,
+            literate=literate,
+            last_fen=last_fen,
+            evals=evals,
+            since=since,
+        ):
+            yield ChessGameV2.from_dict(game_dict, lazy=lazy)
+
+    def stream_game_dicts_for_user_v2(
+        self,
+        username: str,
+        *,
+        max: Optional[int] = None,
+        rated: Optional[bool] = None,
+        perf_type: Optional[PerfType] = None,
+        tags: Optional[bool] = None,
+        sort: Optional[Sort] = None,
+        opening: Optional[bool] = None,
+        finished: Optional[bool] = None,
+        literate: Optional[bool] = None,
+        last_fen: Optional[bool] = None,
+        evals: Optional[bool] = None,
+        since: Optional[int] = None,
+    ) -> Iterator[dict]:
+        """
+        Yields each game's raw dict as soon as its line of the NDJSON response arrives.
+        """
         headers = {"Accept": "application/x-ndjson"}
 
-        url = f"{cls.__BASE_URL}{cls.__GAMES_ROUTE}{cls.__USER_ROUTE}/{username}"
+        url = f"{self.__base_url}{self.__GAMES_ROUTE}{self.__USER_ROUTE}/{username}"
 
         params = {}
         if max is not None:
@@ -101,15 +176,18 @@ class LichessApiClient(BaseApiClient):
             params["literate"] = literate
         if last_fen is not None:
             params["lastFen"] = last_fen
+        if evals is not None:
+            params["evals"] = evals
+        if since is not None:
+            params["since"] = since
 
-        url = cls._build_url_with_params(url, params)
+        url = self._build_url_with_params(url, params)
 
-        response = cls._rest_call(requests.get, url, headers=headers)
+        response = self._rest_call("GET", url, headers=headers, stream=True)
 
-        # need this instead of .json for application/x-ndjson response
-        data = [json.loads(line) for line in response.iter_lines(decode_unicode=True) if line]
-
-        games_list = []
-        for game in data:
-            games_list.append(ChessGameV2.from_dict(game))
-        return games_list
+        with response:
+            # need this instead of .json for application/x-ndjson response
+            # lines are parsed as raw bytes, which every json backend accepts
+            for line in response.iter_lines():
+                if line:
+                    yield json_backend.loads(line)
@@ -1,12 +1,18 @@
+import asyncio
 import os
 import tempfile
 import time
+from typing import Optional
 
+import chess.engine
 import schedule
 
+from api.BaseApiClient import BaseApiClient
+from engine.EvaluationBudget import EvaluationBudget
+from engine.StockfishPool import StockfishPool
+from engine.SyzygyTablebase import SyzygyTablebase
 from enumeration.ChessColor import ChessColor
 from enumeration.ChessGameOutcome import ChessGameOutcome
-from enumeration.ChessStatus import ChessStatus
 from enumeration.Color import Color
 from enumeration.HexColor import HexColor
 from enumeration.PerfType import PerfType
@@ -14,109 +20,266 @@ from enumeration.Sort import Sort
 from model.chess_image import ChessBoardArrow, ChessBoardImage
 from model.ChessGameV2 import ChessGameV2
 from model.ChessOpening import ChessOpening
-from service.chess_game import get_games_for_user_v2
-from service.evaluate_game import get_worst_move_for_user
+from model.MoveEval import MoveEval
+from model.OpeningStats import OpeningStats
+from model.PositionTrie import PositionTrie
+from model.RatingRollup import RatingRollup
+from model.ReportAggregator import ReportAggregator
+from service.chess_game import get_games_for_users_v2, sync_games_for_users_v2
+from service.evaluate_game import (
+    get_num_positions_to_search,
+    get_stockfish_path,
+    get_worst_moves_for_user,
+)
+from service.evaluate_game_async import get_worst_moves_for_user_async
 from service.user_eval import (
-    get_average_rating_change_in_games,
     get_current_date_as_string,
     get_elo_string,
     get_emoji_for_color,
     get_emoji_for_elo,
-    get_games_with_negative_rating_change,
-    get_games_with_opening,
-    get_opening_infos,
-    get_record_in_games,
     get_record_string,
 )
+from store.DailyStatsStore import DailyStatsStore
+from store.EvaluationCache import EvaluationCache
+from store.GameStore import GameStore
+from store.RatingHistoryStore import RatingHistoryStore
 from util.discord import send_discord_message
 from util.EnvironmentReader import EnvironmentReader
 
 TEST = EnvironmentReader.get("TEST", "false").lower() == "true"
 RUN_AT_TIME = EnvironmentReader.get("RUN_AT_TIME")
-USERNAME = EnvironmentReader.get("LICHESS_USERNAME")
+# comma separated to report on multiple users
+USERNAMES = [username.strip() for username in EnvironmentReader.get("LICHESS_USERNAME").split(",")]
 NUM_GAMES = int(EnvironmentReader.get("NUM_GAMES"))
 PERF_TYPE = PerfType.from_str(EnvironmentReader.get("PERF_TYPE"))
 WEBHOOK_URL = EnvironmentReader.get("DISCORD_WEBHOOK_URL")
 DISCORD_DAILY_OPENINGS_TO_SEND = int(EnvironmentReader.get("DISCORD_DAILY_OPENINGS_TO_SEND"))
 EVALUATION_DEPTH = int(EnvironmentReader.get("EVALUATION_DEPTH"))
+# when set, moves are scanned at this depth first and only big swings are searched at EVALUATION_DEPTH
+SHALLOW_EVALUATION_DEPTH = (
+    int(EnvironmentReader.get("SHALLOW_EVALUATION_DEPTH"))
+    if EnvironmentReader.get("SHALLOW_EVALUATION_DEPTH")
+    else None
+)
+SHALLOW_EVALUATION_SWING = int(EnvironmentReader.get("SHALLOW_EVALUATION_SWING", "100"))
+SKIP_OPENING_BOOK = EnvironmentReader.get("SKIP_OPENING_BOOK", "false").lower() == "true"
+SYZYGY_PATH = EnvironmentReader.get("SYZYGY_PATH")
+EVALUATION_TIME_BUDGET_SECONDS = EnvironmentReader.get("EVALUATION_TIME_BUDGET_SECONDS")
 MAX_LOSSES_TO_EVALUATE = int(EnvironmentReader.get("MAX_LOSSES_TO_EVALUATE"))
 STOP_AFTER_EVAL_CHANGE_OF = int(EnvironmentReader.get("STOP_AFTER_EVAL_CHANGE_OF"))
+DATABASE_PATH = EnvironmentReader.get("DATABASE_PATH")
+FETCH_WORKERS = int(EnvironmentReader.get("FETCH_WORKERS", "4"))
+LICHESS_API_BASE_URL = EnvironmentReader.get("LICHESS_API_BASE_URL")
 STOCKFISH_EXECUTABLE_NAME = "stockfish_macos" if TEST else "stockfish"
+STOCKFISH_POOL_SIZE = int(EnvironmentReader.get("STOCKFISH_POOL_SIZE", "1"))
+# "stockfish" or "python-chess"
+ENGINE_BACKEND = EnvironmentReader.get("ENGINE_BACKEND", "stockfish").lower()
 SPOILER_DELIMETER = "||"
+# windows (in days) of the trends in the report, only sent when DATABASE_PATH is set
+TREND_WINDOWS_IN_DAYS = [7, 30, 90]
+
+# started on first use and kept for the lifetime of the scheduler process
+stockfish_pool: Optional[StockfishPool] = None
+evaluation_cache: Optional[EvaluationCache] = None
+syzygy_tablebase: Optional[SyzygyTablebase] = None
+
+
+def get_stockfish_pool() -> StockfishPool:
+    global stockfish_pool
+    if stockfish_pool is None:
+        stockfish_pool = StockfishPool(
+            stockfish_path=get_stockfish_path(STOCKFISH_EXECUTABLE_NAME), size=STOCKFISH_POOL_SIZE
+        )
+    return stockfish_pool
+
+
+def get_evaluation_cache() -> EvaluationCache:
+    global evaluation_cache
+    if evaluation_cache is None:
+        evaluation_cache = EvaluationCache(database_path=DATABASE_PATH)
+    return evaluation_cache
+
+
+def get_syzygy_tablebase() -> Optional[SyzygyTablebase]:
+    global syzygy_tablebase
+    if syzygy_tablebase is None and SYZYGY_PATH:
+        syzygy_tablebase = SyzygyTablebase(directory=SYZYGY_PATH)
+    return syzygy_tablebase
 
 
 def main() -> None:
-    games: list[ChessGameV2] = get_games_for_user_v2(
-        USERNAME,
-        max=NUM_GAMES,
-        rated=True,
-        perf_type=PERF_TYPE,
-        tags=True,
-        sort=Sort.DATE_DESC,
-        opening=True,
-        finished=True,
-        literate=True,
-        last_fen=True,
+    max_workers = min(FETCH_WORKERS, len(USERNAMES))
+    if DATABASE_PATH:
+        game_store = GameStore(DATABASE_PATH)
+        # the stores below are fed every game downloaded since the last run, the report only the last NUM_GAMES
+        games_by_username, synced_games_by_username = sync_games_for_users_v2(
+            game_store,
+            USERNAMES,
+            max=NUM_GAMES,
+            perf_type=PERF_TYPE,
+            max_workers=max_workers,
+            base_url=LICHESS_API_BASE_URL,
+            rated=True,
+            tags=True,
+            opening=True,
+            finished=True,
+            literate=True,
+            last_fen=True,
+            evals=True,
+            lazy=True,
+        )
+        game_store.close()
+    else:
+        games_by_username = get_games_for_users_v2(
+            USERNAMES,
+            max_workers=max_workers,
+            base_url=LICHESS_API_BASE_URL,
+            max=NUM_GAMES,
+            rated=True,
+            perf_type=PERF_TYPE,
+            tags=True,
+            sort=Sort.DATE_DESC,
+            opening=True,
+            finished=True,
+            literate=True,
+            last_fen=True,
+            evals=True,
+            lazy=True,
+        )
+
+    # everything the reports need is gathered in one pass over each user's games
+    reports = {
+        username: ReportAggregator.from_games(
+            games, username=username, max_losses_to_evaluate=MAX_LOSSES_TO_EVALUATE
+        )
+        for username, games in games_by_username.items()
+    }
+
+    # username -> window in days -> totals per opening and color
+    trends_by_username: dict[str, dict[int, list[OpeningStats]]] = {}
+    # username -> the day of the user's highest rating on record
+    peaks_by_username: dict[str, Optional[RatingRollup]] = {}
+    if DATABASE_PATH:
+        daily_stats_store = DailyStatsStore(DATABASE_PATH)
+        rating_history_store = RatingHistoryStore(DATABASE_PATH)
+        for username, synced_games in synced_games_by_username.items():
+            num_added = daily_stats_store.add_games(username=username, games=synced_games)
+            print(f"ADDED {num_added} NEW GAMES TO DAILY STATS FOR {username}...")
+            trends_by_username[username] = {
+                days: daily_stats_store.get_opening_stats(
+                    username=username, perf_type=PERF_TYPE, days=days
+                )
+                for days in TREND_WINDOWS_IN_DAYS
+            }
+            num_added = rating_history_store.add_games(username=username, games=synced_games)
+            print(f"ADDED {num_added} NEW RATINGS TO RATING HISTORY FOR {username}...")
+            peaks_by_username[username] = rating_history_store.get_peak(
+                username=username, perf_type=PERF_TYPE
+            )
+        daily_stats_store.close()
+        rating_history_store.close()
+
+    evaluation_budget = None
+    if EVALUATION_TIME_BUDGET_SECONDS:
+        # one budget is shared by the evaluation of every user's losses
+        evaluation_budget = EvaluationBudget(
+            seconds=float(EVALUATION_TIME_BUDGET_SECONDS),
+            num_positions=sum(
+                get_num_positions_to_search(
+                    game, username=username, skip_opening_book=SKIP_OPENING_BOOK
+                )
+                for username, report in reports.items()
+                for game in report.losses_to_evaluate
+            ),
+            num_workers=STOCKFISH_POOL_SIZE,
+        )
+
+    # every user's losses are evaluated before any report is sent, so posting to Discord does not use up the budget
+    worst_moves_by_username = {
+        username: evaluate_losses(
+            username=username, report=report, evaluation_budget=evaluation_budget
+        )
+        for username, report in reports.items()
+    }
+
+    for username, report in reports.items():
+        send_report(
+            username=username,
+            report=report,
+            worst_moves=worst_moves_by_username[username],
+            trends=trends_by_username.get(username),
+            peak=peaks_by_username.get(username),
+        )
+
+    evaluation_cache_stats = get_evaluation_cache().get_stats()
+    get_evaluation_cache().reset_stats()
+    print(
+        f"EVALUATION CACHE HITS: {evaluation_cache_stats.hits} ({evaluation_cache_stats.memory_hits} MEMORY, {evaluation_cache_stats.disk_hits} DISK) | MISSES: {evaluation_cache_stats.misses} | HIT RATE: {evaluation_cache_stats.hit_rate:.1%}"
     )
 
-    print(f"SUCCESSFULLY RETRIEVED {len(games)} GAMES...")
-
-    # calculate net elo for each opening
-    # openings_and_net_elo = defaultdict(float)
-
-    # calculate best and worst user/elo beat and lost to
-    highest_elo_beat = None
-    lowest_elo_lost = None
-    highest_elo_beat_username = None
-    lowest_elo_lost_username = None
-
-    # keep track of each game's outcome (status)
-    status_and_count = {}
-    for _, status in ChessStatus.items():
-        status_and_count[status] = {}
-        for _, outcome in ChessGameOutcome.items():
-            status_and_count[status][outcome] = 0
-
-    # holds urls, game outcome
-    openings_and_game: dict[str, list[ChessGameV2]] = {}
-    for game in games:
-        if game.opening.name not in openings_and_game.keys():
-            openings_and_game[game.opening.name] = []
-
-        # get game outcome (status)
-        game_outcome = game.outcome_for_user(USERNAME)
-        status_and_count[game.status.value][game_outcome.value] += 1
-
-        # calculate best win / worst loss
-        if game_outcome != ChessGameOutcome.TIE:
-            winner_elo = game.winning_player.rating
-            loser_elo = game.losing_player.rating
-
-            if game_outcome == ChessGameOutcome.WIN and (
-                highest_elo_beat is None or loser_elo > highest_elo_beat
-            ):
-                highest_elo_beat = loser_elo
-                highest_elo_beat_username = game.losing_player.user.name
-            elif game_outcome == ChessGameOutcome.LOSS and (
-                lowest_elo_lost is None or winner_elo < lowest_elo_lost
-            ):
-                lowest_elo_lost = winner_elo
-                lowest_elo_lost_username = game.winning_player.user.name
-
-        openings_and_game[game.opening.name].append(game)
-        # sort
-        # primary sort on: win -> loss -> tie
-        # secondary sort on: status
-        openings_and_game[game.opening.name].sort(
-            key=lambda game: (
-                {
-                    ChessGameOutcome.WIN.value: 0,
-                    ChessGameOutcome.LOSS.value: 1,
-                    ChessGameOutcome.TIE.value: 2,
-                }[game.outcome_for_user(USERNAME).value],
-                game.status.value,
+    if get_syzygy_tablebase() is not None:
+        tablebase_stats = get_syzygy_tablebase().get_stats()
+        get_syzygy_tablebase().reset_stats()
+        print(f"TABLEBASE HITS: {tablebase_stats.hits} | MISSES: {tablebase_stats.misses}")
+
+    http_stats = BaseApiClient.get_stats()
+    BaseApiClient.reset_stats()
+    print(
+        f"HTTP CALLS: {http_stats.calls} | RETRIES: {http_stats.retries} | FAILURES: {http_stats.failures} | AVERAGE LATENCY: {http_stats.average_latency_seconds:.3f}s"
+    )
+
+
+def evaluate_losses(
+    *, username: str, report: ReportAggregator, evaluation_budget: Optional[EvaluationBudget] = None
+) -> list[Optional[MoveEval]]:
+    """
+    Returns the worst move of each of the report's losses to evaluate, None for a loss that could not be evaluated.
+    """
+    # get eval for each loss
+    evaluate_games = report.losses_to_evaluate
+
+    print(f"EVALUATING {len(evaluate_games)} GAMES...")
+    if ENGINE_BACKEND == "python-chess":
+        return asyncio.run(
+            get_worst_moves_for_user_async(
+                chess_games=evaluate_games,
+                username=username,
+                stockfish_path=get_stockfish_path(STOCKFISH_EXECUTABLE_NAME),
+                limit=chess.engine.Limit(depth=EVALUATION_DEPTH),
+                stop_after_eval_change_of=STOP_AFTER_EVAL_CHANGE_OF,
+                num_engines=STOCKFISH_POOL_SIZE,
             )
         )
+    else:
+        position_trie = PositionTrie.from_games(evaluate_games)
+        print(
+            f"{position_trie.num_positions} UNIQUE POSITIONS ACROSS {position_trie.num_plies} PLIES"
+        )
+        return get_worst_moves_for_user(
+            chess_games=evaluate_games,
+            username=username,
+            evaluation_depth=EVALUATION_DEPTH,
+            stop_after_eval_change_of=STOP_AFTER_EVAL_CHANGE_OF,
+            stockfish_pool=get_stockfish_pool(),
+            evaluation_cache=get_evaluation_cache(),
+            shallow_depth=SHALLOW_EVALUATION_DEPTH,
+            shallow_swing_threshold=SHALLOW_EVALUATION_SWING,
+            skip_opening_book=SKIP_OPENING_BOOK,
+            tablebase=get_syzygy_tablebase(),
+            evaluation_budget=evaluation_budget,
+            position_trie=position_trie,
+        )
+
+
+def send_report(
+    *,
+    username: str,
+    report: ReportAggregator,
+    worst_moves: list[Optional[MoveEval]],
+    trends: Optional[dict[int, list[OpeningStats]]] = None,
+    peak: Optional[RatingRollup] = None,
+) -> None:
+    print(f"SUCCESSFULLY RETRIEVED {report.num_games} GAMES...")
 
     # store all openings and the frequency
     opening_and_frequency_embeds = []
@@ -124,9 +287,8 @@ def main() -> None:
     # store info about worst and best openings
     opening_detail_fields = []
 
-    opening_infos = get_opening_infos(games=games, for_username=USERNAME)
-    # sort from worst elo -> best elo
-    opening_infos.sort(key=lambda opening: opening.net_elo)
+    # sorted from worst elo -> best elo
+    opening_infos = report.get_opening_infos()
     for opening_info in opening_infos:
         record_str = get_record_string(opening_info.player_outcomes)
         elo_string = get_elo_string(opening_info.net_elo)
@@ -146,23 +308,17 @@ def main() -> None:
         )
 
     game_eval_embeds = []
-
-    # get eval for each loss
-    evaluate_games = [g for g in games if g.outcome_for_user(USERNAME) == ChessGameOutcome.LOSS][
-        :MAX_LOSSES_TO_EVALUATE
-    ]
+    evaluate_games = report.losses_to_evaluate
 
     chess_board_images: list[ChessBoardImage] = []
-    for i, game in enumerate(evaluate_games):
-        print(f"EVALUATING GAME {i+1}/{len(evaluate_games)}")
-        worst_move = get_worst_move_for_user(
-            chess_game=game,
-            username=USERNAME,
-            evaluation_depth=EVALUATION_DEPTH,
-            stockfish_executable_name=STOCKFISH_EXECUTABLE_NAME,
-            stop_after_eval_change_of=STOP_AFTER_EVAL_CHANGE_OF,
-        )
-        user_color = game.color_for_user(USERNAME)
+    # games that could not be evaluated are left out of the report
+    evaluated_games = [
+        (game, worst_move)
+        for game, worst_move in zip(evaluate_games, worst_moves)
+        if worst_move is not None
+    ]
+    for i, (game, worst_move) in enumerate(evaluated_games):
+        user_color = game.color_for_user(username)
         game_eval_embeds.append(
             {
                 "title": f"{ChessGameOutcome.LOSS.value} ({game.status.value}) as {user_color.value}",
@@ -170,7 +326,7 @@ def main() -> None:
                 "color": HexColor.WHITE.value
                 if user_color == ChessColor.WHITE
                 else HexColor.BLACK.value,
-                "footer": {"text": f"{i+1}/{len(evaluate_games)}"},
+                "footer": {"text": f"{i+1}/{len(evaluated_games)}"},
             }
         )
         worst_move_start_coordinate = worst_move.actual_move[:2]
@@ -200,7 +356,7 @@ def main() -> None:
 
     status_embed_fields = []
     # create embeds for each game outcome type (status)
-    for status, outcomes in status_and_count.items():
+    for status, outcomes in report.status_counts.items():
         # ensure that there was at least 1 game with this status before adding it
         if (
             outcomes[ChessGameOutcome.WIN.value]
@@ -242,12 +398,12 @@ def main() -> None:
         "fields": [
             {
                 "name": "Best Win",
-                "value": f"**{highest_elo_beat_username}**: {highest_elo_beat}",
+                "value": f"**{report.highest_elo_beat_username}**: {report.highest_elo_beat}",
                 "inline": True,
             },
             {
                 "name": "Worst Loss",
-                "value": f"**{lowest_elo_lost_username}**: {lowest_elo_lost}",
+                "value": f"**{report.lowest_elo_lost_username}**: {report.lowest_elo_lost}",
                 "inline": True,
             },
         ],
@@ -261,8 +417,8 @@ def main() -> None:
     }
 
     # calculate elo change
-    starting_elo = games[-1].get_chess_player(USERNAME).rating
-    ending_elo = games[0].get_chess_player(USERNAME).rating_after_game
+    starting_elo = report.starting_elo
+    ending_elo = report.ending_elo
     elo_dif = str(ending_elo - starting_elo)
 
     # format elo dif
@@ -278,18 +434,44 @@ def main() -> None:
         {"name": "Ending Elo", "value": str(ending_elo), "inline": False},
         {"name": "Elo Change", "value": elo_dif, "inline": False},
     ]
+    if peak is not None:
+        elo_recap_fields.append(
+            {
+                "name": "Peak Elo",
+                "value": f"{peak.max_rating} ({peak.start_day.strftime('%B %-d, %Y')})",
+                "inline": False,
+            }
+        )
 
     title_embed = {
-        "title": f"Chess Update: {get_current_date_as_string()} :chess_pawn:",
-        "description": f"Recap of your last {NUM_GAMES} games.",
+        # several users' reports can go to the same webhook
+        "title": f"Chess Update for {username}: {get_current_date_as_string()} :chess_pawn:",
+        "description": f"Recap of {username}'s last {NUM_GAMES} games.",
         "fields": elo_recap_fields,
         "color": HexColor.BLUE.value,
     }
 
+    embeds = [title_embed]
+
+    if trends is not None:
+        trend_fields = []
+        for days, opening_stats in trends.items():
+            wins = sum(stats.wins for stats in opening_stats)
+            losses = sum(stats.losses for stats in opening_stats)
+            ties = sum(stats.ties for stats in opening_stats)
+            net_elo = sum(stats.net_elo for stats in opening_stats)
+            value = f"GAMES PLAYED: {wins + losses + ties}\nRECORD: {wins}-{losses}-{ties}\nELO: {get_elo_string(net_elo)} {get_emoji_for_elo(net_elo)}"
+            # sorted from worst elo -> best elo
+            if opening_stats and opening_stats[0].net_elo < 0:
+                value += f"\nWORST OPENING: {opening_stats[0].opening_name} {get_emoji_for_color(opening_stats[0].player_color)} ({get_elo_string(opening_stats[0].net_elo)})"
+            trend_fields.append({"name": f"Last {days} Days", "value": value, "inline": False})
+        embeds.append(
+            {"description": "Trends", "fields": trend_fields, "color": HexColor.LIGHT_BLUE.value}
+        )
+
     print(f"SENDING EMBEDS TO DISCORD...")
     # send embeds without images to discord
-    for embed in [
-        title_embed,
+    for embed in embeds + [
         terminations_embed,
         best_win_and_worst_loss_embed,
         worst_openings_embed,
@@ -310,25 +492,18 @@ def main() -> None:
             time.sleep(1)
 
     # send worst opening embed with info for analysis
-    worst_opening_games = get_games_with_opening(
-        games=games, opening_name=opening_infos[0].chess_opening.name
-    )
-    record_w, record_l, record_t = get_record_in_games(games=worst_opening_games, username=USERNAME)
-    games_with_bad_rating_change = get_games_with_negative_rating_change(
-        games=worst_opening_games, username=USERNAME, include_zero=True
-    )
-    # sort lowest -> highest rating change
-    games_with_bad_rating_change.sort(key=lambda game: game.get_chess_player(USERNAME).rating_diff)
-    # TODO: dont hardcode this value
-    games_to_include = games_with_bad_rating_change[:5]
+    worst_opening_name = opening_infos[0].chess_opening.name
+    record_w, record_l, record_t = report.get_record_with_opening(worst_opening_name)
+    # lowest -> highest rating change
+    games_to_include = report.get_worst_games_with_opening(worst_opening_name)
 
     worst_opening_content = f"**[{opening_infos[0].chess_opening.name}]({ChessOpening.get_lichess_url(opening_infos[0].chess_opening.name)})**\n"
 
     # add game links
     for g in games_to_include:
-        worst_opening_content += f"[{g.outcome_for_user(USERNAME).value} ({g.status.value}) as {g.color_for_user(USERNAME).value}]({g.game_url})\n"
+        worst_opening_content += f"[{g.outcome_for_user(username).value} ({g.status.value}) as {g.color_for_user(username).value}]({g.game_url})\n"
 
-    worst_opening_content += f"\n**{get_elo_string(get_average_rating_change_in_games(games=worst_opening_games, username=USERNAME))}** elo per game"
+    worst_opening_content += f"\n**{get_elo_string(report.get_average_rating_change_with_opening(worst_opening_name))}** elo per game"
 
     worst_opening_embed = {
         "title": "Analyze Your Worst Opening",
@@ -0,0 +1,256 @@
+"""
+Finds the worst move in every game of a recorded archive, without posting anything to Discord.
+
+Run from the root of the project:
+    python batch.py games.ndjson --username <lichess username> --output worst_moves.jsonl
+
+The archive can be a Lichess NDJSON export or a PGN file.
+Results are appended to the output file as each game finishes, so an interrupted run picks up where it left off.
+The archive is read and evaluated --chunk-size games at a time, so memory holds one chunk's games and
+position trie however large the archive is. Positions shared across chunks are still reused through the evaluation cache.
+"""
+import argparse
+import json
+import os
+import time
+from itertools import islice
+from typing import Iterator, Optional
+
+import chess.pgn
+
+from engine.StockfishPool import StockfishPool
+from engine.SyzygyTablebase import SyzygyTablebase
+from enumeration.ChessGameOutcome import ChessGameOutcome
+from model.ChessGameV2 import ChessGameV2
+from model.GameCollection import GameCollection
+from model.PositionTrie import PositionTrie
+from service.evaluate_game import get_stockfish_path, iter_worst_moves_for_user
+from store.EvaluationCache import EvaluationCache
+from util import json_backend
+
+PRINT_THROUGHPUT_EVERY = 100
+DEFAULT_CHUNK_SIZE = 10_000
+
+
+def read_games(path: str, *, username: str) -> Iterator[ChessGameV2]:
+    """
+    Reads the given user's games from a Lichess NDJSON export, or from a PGN file if the path ends in .pgn.
+    Games against the AI (no user) and casual games (no rating diff) are skipped.
+    Games that cannot be read, e.g. with a status ChessStatus does not have, are logged, counted and skipped.
+    """
+    num_unreadable = 0
+    if path.lower().endswith(".pgn"):
+        with open(path) as f:
+            while (game := chess.pgn.read_game(f)) is not None:
+                headers = game.headers
+                if username not in (headers.get("White"), headers.get("Black")):
+                    continue
+                # the PGN export has no RatingDiff headers for casual games and games against the AI
+                if "WhiteRatingDiff" not in headers or "BlackRatingDiff" not in headers:
+                    print(f"SKIPPING GAME {headers.get('Site', '?')}: NO RATING DIFF")
+                    continue
+                try:
+                    chess_game = ChessGameV2.from_pgn_game(game)
+                except (ValueError, KeyError) as e:
+                    print(f"SKIPPING GAME {headers.get('Site', '?')}: COULD NOT READ IT ({e!r})")
+                    num_unreadable += 1
+                    continue
+                yield chess_game
+    else:
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    d = json_backend.loads(line)
+                except ValueError as e:
+                    print(f"SKIPPING LINE: NOT JSON ({e!r})")
+                    num_unreadable += 1
+                    continue
+                # players are checked on the raw dicts, ChessPlayer.from_dict needs both keys
+                players = d.get("players", {})
+                white, black = players.get("white", {}), players.get("black", {})
+                if username not in (
+                    white.get("user", {}).get("name"),
+                    black.get("user", {}).get("name"),
+                ):
+                    continue
+                if "user" not in white or "user" not in black:
+                    print(f"SKIPPING GAME {d.get('id')}: NO USER (AI OPPONENT)")
+                    continue
+                if "ratingDiff" not in white or "ratingDiff" not in black:
+                    print(f"SKIPPING GAME {d.get('id')}: NO RATING DIFF (CASUAL)")
+                    continue
+                # decoded in full here, so a bad game is skipped now instead of failing the run later
+                try:
+                    chess_game = ChessGameV2.from_dict(d)
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"SKIPPING GAME {d.get('id')}: COULD NOT READ IT ({e!r})")
+                    num_unreadable += 1
+                    continue
+                yield chess_game
+    if num_unreadable:
+        print(f"SKIPPED {num_unreadable} GAMES THAT COULD NOT BE READ")
+
+
+def read_finished_game_ids(path: str) -> set[str]:
+    """
+    Returns the ids of the games already in the output file.
+    A line cut off by a stopped run is removed, so the next game is not appended onto it.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            print("REMOVING UNFINISHED LAST LINE OF OUTPUT...")
+            data = data[: data.rfind(b"\n") + 1]
+            f.truncate(len(data))
+    finished_game_ids = set()
+    for line in data.splitlines():
+        try:
+            finished_game_ids.add(json.loads(line)["id"])
+        except (ValueError, KeyError):
+            continue
+    return finished_game_ids
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Find the worst move in every game of an archive.")
+    parser.add_argument("archive", help="path to a Lichess NDJSON export or a PGN file")
+    parser.add_argument("--username", required=True, help="the player whose moves are evaluated")
+    parser.add_argument("--output", required=True, help="path to the JSONL file to write to")
+    parser.add_argument("--depth", type=int, default=15, help="evaluation depth (default: 15)")
+    parser.add_argument(
+        "--stop-after-eval-change-of",
+        type=int,
+        default=-10_000,
+        help="stop evaluating a game once a move changes the evaluation by this much",
+    )
+    parser.add_argument(
+        "--engines", type=int, default=os.cpu_count() or 1, help="number of engines to run"
+    )
+    parser.add_argument(
+        "--stockfish-path", default=get_stockfish_path("stockfish"), help="path to Stockfish"
+    )
+    parser.add_argument("--losses-only", action="store_true", help="only evaluate losses")
+    parser.add_argument("--shallow-depth", type=int, help="see SHALLOW_EVALUATION_DEPTH")
+    parser.add_argument(
+        "--shallow-swing", type=int, default=100, help="see SHALLOW_EVALUATION_SWING"
+    )
+    parser.add_argument("--skip-opening-book", action="store_true", help="see SKIP_OPENING_BOOK")
+    parser.add_argument("--syzygy-path", help="see SYZYGY_PATH")
+    parser.add_argument("--database-path", help="SQLite database to cache evaluations in")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"number of games held in memory at once (default: {DEFAULT_CHUNK_SIZE})",
+    )
+    args = parser.parse_args()
+
+    finished_game_ids = read_finished_game_ids(args.output)
+    print(f"SKIPPING {len(finished_game_ids)} ALREADY EVALUATED GAMES...")
+
+    def iter_games_to_evaluate() -> Iterator[ChessGameV2]:
+        for game in read_games(args.archive, username=args.username):
+            if game.id in finished_game_ids:
+                continue
+            # other variants do not start from the standard position
+            if game.variant != "standard" or len(game.moves.split(" ")) < 2:
+                continue
+            yield game
+
+    # started with the first chunk that has games to evaluate
+    stockfish_pool: Optional[StockfishPool] = None
+    evaluation_cache = EvaluationCache(database_path=args.database_path)
+    tablebase = SyzygyTablebase(directory=args.syzygy_path) if args.syzygy_path else None
+
+    start = time.perf_counter()
+
+    def print_throughput(num_games: int) -> None:
+        seconds = time.perf_counter() - start
+        # each unique position goes through the cache or the tablebase, whether or not it is searched
+        num_positions = evaluation_cache.get_stats().hits + evaluation_cache.get_stats().misses
+        if tablebase is not None:
+            num_positions += tablebase.get_stats().hits
+        print(
+            f"EVALUATED {num_games} GAMES ({num_positions} POSITIONS) IN {seconds:.1f}s | {num_games / seconds:.2f} GAMES/SEC | {num_positions / seconds:.1f} POSITIONS/SEC"
+        )
+
+    num_evaluated = 0
+    games_to_evaluate = iter_games_to_evaluate()
+    try:
+        with open(args.output, "a") as output:
+            while chunk := list(islice(games_to_evaluate, args.chunk_size)):
+                # the user's color and outcome in each game are worked out once, here
+                game_collection = GameCollection.from_games(chunk, username=args.username)
+                if args.losses_only:
+                    game_collection = game_collection.get_games_with_outcome(ChessGameOutcome.LOSS)
+                games = game_collection.games
+                if not games:
+                    continue
+                print(f"EVALUATING {len(games)} GAMES...")
+                if stockfish_pool is None:
+                    stockfish_pool = StockfishPool(
+                        stockfish_path=args.stockfish_path, size=args.engines
+                    )
+
+                position_trie = PositionTrie()
+                for game in games:
+                    try:
+                        position_trie.add_game(game)
+                    except ValueError as e:
+                        # the game is still attempted, and its failure logged, when it is evaluated
+                        print(f"COULD NOT REPLAY GAME {game.id}: {e}")
+                print(
+                    f"{position_trie.num_positions} UNIQUE POSITIONS ACROSS {position_trie.num_plies} PLIES"
+                )
+
+                for i, worst_move in iter_worst_moves_for_user(
+                    chess_games=games,
+                    username=args.username,
+                    evaluation_depth=args.depth,
+                    stop_after_eval_change_of=args.stop_after_eval_change_of,
+                    stockfish_pool=stockfish_pool,
+                    evaluation_cache=evaluation_cache,
+                    shallow_depth=args.shallow_depth,
+                    shallow_swing_threshold=args.shallow_swing,
+                    skip_opening_book=args.skip_opening_book,
+                    tablebase=tablebase,
+                    position_trie=position_trie,
+                ):
+                    game = games[i]
+                    output.write(
+                        json.dumps(
+                            {
+                                "id": game.id,
+                                "username": args.username,
+                                "color": game_collection.get_color(i).value,
+                                "outcome": game_collection.get_outcome(i).value,
+                                "actual_move": worst_move.actual_move,
+                                "eval_change": worst_move.eval_change,
+                                "fen_before_move": worst_move.fen_before_move,
+                                "engine_best_move": worst_move.engine_best_move,
+                            }
+                        )
+                        + "\n"
+                    )
+                    # flushed per game so a stopped run loses no finished games
+                    output.flush()
+                    num_evaluated += 1
+                    if num_evaluated % PRINT_THROUGHPUT_EVERY == 0:
+                        print_throughput(num_evaluated)
+    finally:
+        if stockfish_pool is not None:
+            stockfish_pool.close()
+        evaluation_cache.close()
+        if tablebase is not None:
+            tablebase.close()
+
+    if num_evaluated:
+        print_throughput(num_evaluated)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Timing and printing shared by the benchmarks.
+"""
+import time
+from typing import Callable
+
+REPEATS = 5
+
+
+def time_best_of(function: Callable[[], object], *, repeats: int = REPEATS) -> float:
+    """
+    Returns the fastest of `repeats` calls, in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def print_results(
+    title: str,
+    results: dict[str, float],
+    *,
+    scale: float = 1000,
+    unit: str = "ms",
+    decimals: int = 1,
+    name_width: int = 40,
+) -> None:
+    """
+    Prints the title, then one line per result with its seconds multiplied by `scale`.
+    """
+    print(title)
+    for name, seconds in results.items():
+        print(f"{name:<{name_width}} {seconds * scale:>8.{decimals}f}{unit}")
@@ -0,0 +1,74 @@
+"""
+Times parsing of Lichess NDJSON game exports.
+
+Run from the root of the project:
+    python -m benchmark.parse_games
+"""
+import json
+
+from benchmark.common import REPEATS, print_results, time_best_of
+from enumeration.ChessStatus import ChessStatus
+from model.ChessGameV2 import ChessGameV2
+from model.GameTable import GameTable
+
+NUM_GAMES = 10_000
+
+GAME_TEMPLATE = {
+    "id": "",
+    "rated": True,
+    "variant": "standard",
+    "speed": "blitz",
+    "perf": "blitz",
+    "createdAt": 1700000000000,
+    "lastMoveAt": 1700000300000,
+    "status": "",
+    "players": {
+        "white": {
+            "user": {"name": "WhitePlayer", "id": "whiteplayer"},
+            "rating": 1500,
+            "ratingDiff": 6,
+        },
+        "black": {
+            "user": {"name": "BlackPlayer", "id": "blackplayer"},
+            "rating": 1490,
+            "ratingDiff": -6,
+        },
+    },
+    "winner": "white",
+    "opening": {"eco": "C50", "name": "Italian Game", "ply": 5},
+    "moves": "e4 e5 Nf3 Nc6 Bc4 Bc5 c3 Nf6 d4 exd4 cxd4 Bb4+ Bd2 Bxd2+ Nbxd2 d5",
+    "clock": {"initial": 180, "increment": 0, "totalTime": 180},
+    "lastFen": "r1bqk2r/ppp2ppp/2n2n2/3p4/2BP4/5N2/PP1N1PPP/R2QK2R w KQkq - 0 9",
+}
+
+
+def build_lines(num_games: int) -> list[str]:
+    statuses = [status.value.lower().replace("_", "") for status in ChessStatus]
+    lines = []
+    for i in range(num_games):
+        game = dict(GAME_TEMPLATE, id=f"g{i:07d}", status=statuses[i % len(statuses)])
+        lines.append(json.dumps(game))
+    return lines
+
+
+def main() -> None:
+    lines = build_lines(NUM_GAMES)
+    dicts = [json.loads(line) for line in lines]
+
+    results = {
+        "json.loads": time_best_of(lambda: [json.loads(line) for line in lines]),
+        "ChessGameV2.from_dict": time_best_of(lambda: [ChessGameV2.from_dict(d) for d in dicts]),
+        "ChessGameV2.from_dict (lazy)": time_best_of(
+            lambda: [ChessGameV2.from_dict(d, lazy=True) for d in dicts]
+        ),
+        "ChessStatus.from_str": time_best_of(
+            lambda: [ChessStatus.from_str(d["status"]) for d in dicts]
+        ),
+        "GameTable.from_dicts": time_best_of(lambda: GameTable.from_dicts(dicts)),
+    }
+
+    print_results(f"PARSE TIME PER {NUM_GAMES} GAMES (BEST OF {REPEATS})", results, name_width=32)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Times the per-game cost of parsing the sample NDJSON export with each available json backend.
+
+Run from the root of the project:
+    python -m benchmark.parse_ndjson
+"""
+import json
+import os
+
+from benchmark.common import REPEATS, print_results, time_best_of
+from model.ChessGameV2 import ChessGameV2
+from util import json_backend
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "games.ndjson")
+NUM_GAMES = 10_000
+
+
+def load_lines(num_games: int) -> list[bytes]:
+    with open(FIXTURE_PATH, "rb") as file:
+        fixture_lines = [line.rstrip(b"\n") for line in file if line.strip()]
+    return [fixture_lines[i % len(fixture_lines)] for i in range(num_games)]
+
+
+def main() -> None:
+    lines = load_lines(NUM_GAMES)
+
+    results = {
+        "json.loads (decoded str)": time_best_of(
+            lambda: [json.loads(line.decode("utf-8")) for line in lines]
+        ),
+        "json.loads (bytes)": time_best_of(lambda: [json.loads(line) for line in lines]),
+        f"{json_backend.JSON_BACKEND} (bytes)": time_best_of(
+            lambda: [json_backend.loads(line) for line in lines]
+        ),
+        f"{json_backend.JSON_BACKEND} + ChessGameV2.from_dict": time_best_of(
+            lambda: [ChessGameV2.from_dict(json_backend.loads(line)) for line in lines]
+        ),
+    }
+
+    print_results(
+        f"PARSE COST PER GAME OVER {NUM_GAMES} GAMES (BEST OF {REPEATS})",
+        results,
+        scale=1_000_000 / NUM_GAMES,
+        unit="us",
+        decimals=2,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Times the report statistics (opening infos, record, negative rating changes, average rating change)
+computed with per-game method calls against UserGameStats,
+and the record for each opening found by scanning the games against GameCollection's opening index.
+
+Run from the root of the project:
+    python -m benchmark.user_stats
+"""
+from collections import Counter
+
+from benchmark.common import print_results, time_best_of
+from enumeration.ChessColor import ChessColor
+from model.ChessGameV2 import ChessGameV2
+from model.GameCollection import GameCollection
+from model.GameTable import GameTable
+from model.UserGameStats import UserGameStats
+from model.UserGameStats import numpy as numpy_module
+
+GAME_COUNTS = [10_000, 100_000]
+REPEATS = 3  # fewer than the other benchmarks, the largest count is 100k games
+USERNAME = "WhitePlayer"
+OPENINGS = [
+    {"eco": "C50", "name": "Italian Game", "ply": 5},
+    {"eco": "B20", "name": "Sicilian Defense", "ply": 2},
+    {"eco": "D02", "name": "Queen's Pawn Game", "ply": 3},
+    {"eco": "C00", "name": "French Defense", "ply": 2},
+    {"eco": "A45", "name": "Indian Defense", "ply": 2},
+]
+STATUSES = ["mate", "resign", "outoftime", "draw", "stalemate"]
+
+
+def build_dicts(num_games: int) -> list[dict]:
+    dicts = []
+    for i in range(num_games):
+        user = {"user": {"name": USERNAME, "id": USERNAME.lower()}, "rating": 1500}
+        opponent = {
+            "user": {"name": f"Opponent{i % 50}", "id": f"opponent{i % 50}"},
+            "rating": 1490,
+        }
+        user_is_white = i % 2 == 0
+        user["ratingDiff"] = (i % 13) - 6
+        opponent["ratingDiff"] = -user["ratingDiff"]
+        d = {
+            "id": f"g{i:07d}",
+            "rated": True,
+            "variant": "standard",
+            "speed": "blitz",
+            "perf": "blitz",
+            "createdAt": 1700000000000 + i,
+            "lastMoveAt": 1700000300000 + i,
+            "status": STATUSES[i % len(STATUSES)],
+            "players": {
+                "white": user if user_is_white else opponent,
+                "black": opponent if user_is_white else user,
+            },
+            "opening": OPENINGS[i % len(OPENINGS)],
+            "moves": "e4 e5",
+            "clock": {"initial": 180, "increment": 0, "totalTime": 180},
+            "lastFen": "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",
+        }
+        if i % 3 != 0:
+            d["winner"] = "white" if i % 3 == 1 else "black"
+        dicts.append(d)
+    return dicts
+
+
+def per_game_stats(games: list[ChessGameV2]) -> None:
+    """
+    The statistics as computed before UserGameStats, one method call per game and statistic.
+    """
+    info_tracking = {}
+    for game in games:
+        outcome = game.outcome_for_user(USERNAME)
+        rating_diff = game.get_chess_player(USERNAME).rating_diff
+        key = f"{game.opening.name}{game.color_for_user(USERNAME).name}"
+        if key in info_tracking:
+            info_tracking[key][0] += rating_diff
+            info_tracking[key][1].append(outcome)
+        else:
+            info_tracking[key] = [rating_diff, [outcome]]
+    Counter(game.outcome_for_user(USERNAME) for game in games)
+    [game for game in games if game.get_chess_player(USERNAME).rating_diff <= 0]
+    sum(game.get_chess_player(USERNAME).rating_diff for game in games) / len(games)
+
+
+def user_game_stats(games) -> None:
+    user_game_stats = UserGameStats.from_games(games, USERNAME)
+    user_game_stats.get_opening_infos()
+    user_game_stats.get_record()
+    user_game_stats.get_negative_rating_change_indexes()
+    user_game_stats.get_average_rating_change()
+
+
+def record_per_opening_scan(games: list[ChessGameV2]) -> None:
+    for opening in OPENINGS:
+        games_with_opening = [game for game in games if game.opening.name == opening["name"]]
+        UserGameStats.from_games(games_with_opening, USERNAME).get_record()
+
+
+def record_per_opening_game_collection(game_collection: GameCollection) -> None:
+    for opening in OPENINGS:
+        game_collection.get_games_with_opening(opening["name"]).stats.get_record()
+
+
+def main() -> None:
+    print(f"NUMPY INSTALLED: {numpy_module is not None}")
+    for num_games in GAME_COUNTS:
+        dicts = build_dicts(num_games)
+        games = [ChessGameV2.from_dict(d) for d in dicts]
+        game_table = GameTable.from_dicts(dicts)
+        game_collection = GameCollection.from_games(games, username=USERNAME)
+        functions = {
+            "per game methods": lambda: per_game_stats(games),
+            "UserGameStats (list)": lambda: user_game_stats(games),
+            "UserGameStats (GameTable)": lambda: user_game_stats(game_table),
+            "record per opening (scan)": lambda: record_per_opening_scan(games),
+            "GameCollection.from_games + index": lambda: GameCollection.from_games(
+                games, username=USERNAME
+            ).get_games_with_color(ChessColor.WHITE),
+            "record per opening (GameCollection)": lambda: record_per_opening_game_collection(
+                game_collection
+            ),
+        }
+        results = {
+            name: time_best_of(function, repeats=REPEATS) for name, function in functions.items()
+        }
+        print_results(f"STATS TIME FOR {num_games} GAMES (BEST OF {REPEATS})", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Checks that the worst move is read from Lichess's server analysis, using fixtures/games_with_analysis.ndjson.
+The fixture is one game in the Lichess NDJSON export format (evals=true): Legal's mate, 10...Bxd1?? 11.Bxf7+ Ke7 12.Nd5#.
+Its analysis entries are hand-written in the export's format, not downloaded, with the usual
+Lichess shape: one entry per ply up to the last move before mate, and best, variation and judgment only on judged moves.
+A game recorded from /api/games/user/<username>?evals=true can replace it, along with the expected values below.
+
+Run from the root of the project:
+    python -m check.lichess_analysis
+"""
+import json
+import os
+
+from model.ChessGameV2 import ChessGameV2
+from service.evaluate_game import get_worst_move_from_analysis
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "games_with_analysis.ndjson")
+STOP_AFTER_EVAL_CHANGE_OF = -10_000
+
+
+def main() -> None:
+    with open(FIXTURE_PATH) as file:
+        (d,) = [json.loads(line) for line in file if line.strip()]
+
+    for lazy in (False, True):
+        chess_game = ChessGameV2.from_dict(d, lazy=lazy)
+
+        # black's 10...Bxd1?? walks into mate in 2 (-268 -> mate), Lichess gives dxe5 as best
+        worst_move = get_worst_move_from_analysis(
+            chess_game=chess_game,
+            username="quiet_bishop",
+            stop_after_eval_change_of=STOP_AFTER_EVAL_CHANGE_OF,
+        )
+        assert worst_move is not None
+        assert worst_move.actual_move == "g4d1", worst_move
+        assert worst_move.eval_change == -9_730, worst_move
+        assert worst_move.engine_best_move == "d6e5", worst_move
+
+        # there is no entry for the mating move, so white's game is left to the engine
+        assert (
+            get_worst_move_from_analysis(
+                chess_game=chess_game,
+                username="KnightRider99",
+                stop_after_eval_change_of=STOP_AFTER_EVAL_CHANGE_OF,
+            )
+            is None
+        )
+
+        assert [move_analysis.to_dict() for move_analysis in chess_game.analysis] == d["analysis"]
+
+    print("ANALYSIS FIXTURE OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional
+
+# roughly how much longer a search takes for each extra ply of depth
+DEPTH_GROWTH_FACTOR = 3
+MIN_DEPTH = 1
+
+
+class EvaluationBudget:
+    """
+    Splits a total wall-clock budget for evaluating a number of positions across the games they belong to.
+    The clock starts when the first game starts, so work done before the first evaluation does not use up the budget.
+    Each game gets a share in proportion to the positions it searches, as a GameBudget with its own deadline,
+    which lowers the search depth when the game falls behind.
+    """
+
+    def __init__(self, *, seconds: float, num_positions: int, num_workers: int = 1):
+        self.__seconds = seconds
+        self.__deadline: Optional[float] = None  # set when the first game starts
+        self.__num_workers = num_workers
+        self.__positions_left = num_positions
+        # games may be started on several threads at once
+        self.__lock = threading.Lock()
+
+    @property
+    def seconds_left(self) -> float:
+        if self.__deadline is None:
+            return self.__seconds
+        return max(self.__deadline - time.monotonic(), 0.0)
+
+    def start_game(self, *, num_positions: int, max_depth: int) -> GameBudget:
+        """
+        Returns the budget for the next game, which is expected to search about num_positions positions.
+        """
+        with self.__lock:
+            if self.__deadline is None:
+                self.__deadline = time.monotonic() + self.__seconds
+            positions_left = max(self.__positions_left, num_positions)
+            self.__positions_left = positions_left - num_positions
+        # up to num_workers games are evaluated at the same time, so each one can use that many shares
+        seconds_left = self.seconds_left
+        share = min(
+            seconds_left * self.__num_workers * num_positions / positions_left, seconds_left
+        )
+        return GameBudget(
+            deadline=time.monotonic() + share, num_positions=num_positions, max_depth=max_depth
+        )
+
+    def skip_game(self, *, num_positions: int) -> None:
+        """
+        Gives back the positions of a game that was counted but does not go to the engine,
+        e.g. one answered from Lichess's analysis, so the other games get its share.
+        """
+        with self.__lock:
+            self.__positions_left = max(self.__positions_left - num_positions, 0)
+
+
+class GameBudget:
+    """
+    The time left to evaluate one game.
+    Searches report how long they took, and the depth is lowered (or raised again, up to max_depth)
+    so the remaining positions fit in the time that is left.
+    """
+
+    def __init__(self, *, deadline: float, num_positions: int, max_depth: int):
+        self.__deadline = deadline
+        self.__positions_left = num_positions
+        self.__max_depth = max_depth
+        self.__depth = max_depth
+
+    @property
+    def is_out_of_time(self) -> bool:
+        return time.monotonic() >= self.__deadline
+
+    def get_depth(self, depth: int) -> int:
+        """
+        Returns the depth to search to instead of the given depth.
+        """
+        if self.is_out_of_time:
+            return MIN_DEPTH
+        return min(depth, self.__depth)
+
+    def add_positions(self, num_positions: int) -> None:
+        """
+        Adds positions found to need searching after the game started, e.g. a second pass at a greater depth.
+        """
+        self.__positions_left += num_positions
+
+    def record_search(self, *, depth: int, seconds: float) -> None:
+        self.__positions_left = max(self.__positions_left - 1, 1)
+        seconds_per_position = max(self.__deadline - time.monotonic(), 0.0) / self.__positions_left
+        # what the search would have taken at the current depth
+        expected_seconds = seconds * DEPTH_GROWTH_FACTOR ** (self.__depth - depth)
+        if expected_seconds > seconds_per_position and self.__depth > MIN_DEPTH:
+            self.__depth -= 1
+        elif (
+            expected_seconds * DEPTH_GROWTH_FACTOR < seconds_per_position
+            and self.__depth < self.__max_depth
+        ):
+            self.__depth += 1
@@ -0,0 +1,87 @@
+import queue
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from stockfish import Stockfish, StockfishException
+
+STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+class StockfishPool:
+    """
+    Starts a fixed number of Stockfish engines once and hands them out to evaluation calls.
+    Engines that have crashed are restarted before being handed out again.
+    If a restart fails, the crashed engine keeps its slot and the next borrower tries to restart it,
+    so the pool never loses a slot and a borrower never waits on a slot that is gone.
+    """
+
+    def __init__(self, *, stockfish_path: str, size: int = 1, parameters: Optional[dict] = None):
+        self.__stockfish_path = stockfish_path
+        self.__parameters = parameters
+        self.__size = size
+        self.__engines: queue.Queue[Stockfish] = queue.Queue()
+        print(f"STARTING {size} STOCKFISH ENGINE(S) FROM: '{stockfish_path}'")
+        for _ in range(size):
+            self.__engines.put(self.__start_engine())
+        print(f"SUCCESSFULLY STARTED STOCKFISH ENGINE(S)")
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @contextmanager
+    def engine(self) -> Iterator[Stockfish]:
+        """
+        Borrows an engine from the pool, waiting for one to be free if needed.
+        Raises if the engine had crashed and could not be restarted.
+        """
+        stockfish = self.__engines.get()
+        try:
+            if not self.__is_healthy(stockfish):
+                print("STOCKFISH ENGINE IS NOT HEALTHY, RESTARTING...")
+                stockfish = self.__restart_engine(stockfish)
+        except BaseException:
+            # the crashed engine keeps its slot, the next borrower tries to restart it
+            self.__engines.put(stockfish)
+            raise
+        try:
+            yield stockfish
+        finally:
+            try:
+                # an engine that crashed mid-evaluation is replaced before anyone else can borrow it
+                if not self.__is_healthy(stockfish):
+                    print("STOCKFISH ENGINE CRASHED, RESTARTING...")
+                    stockfish = self.__restart_engine(stockfish)
+            finally:
+                # if the restart failed this is the crashed engine, which the next borrower restarts
+                self.__engines.put(stockfish)
+
+    def close(self) -> None:
+        """
+        Quits all engines in the pool.
+        """
+        for _ in range(self.__size):
+            self.__quit_engine(self.__engines.get())
+
+    def __start_engine(self) -> Stockfish:
+        return Stockfish(self.__stockfish_path, parameters=self.__parameters)
+
+    def __restart_engine(self, stockfish: Stockfish) -> Stockfish:
+        self.__quit_engine(stockfish)
+        return self.__start_engine()
+
+    @staticmethod
+    def __is_healthy(stockfish: Stockfish) -> bool:
+        """
+        Waits for the engine to answer isready, which raises if its process has exited.
+        """
+        try:
+            stockfish.set_fen_position(STARTING_FEN, send_ucinewgame_token=False)
+        except (StockfishException, OSError):
+            return False
+        return True
+
+    @staticmethod
+    def __quit_engine(stockfish: Stockfish) -> None:
+        # stockfish 3.28 has no public quit, __del__ sends quit to a running engine and waits for it to exit
+        stockfish.__del__()
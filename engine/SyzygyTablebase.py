@@ -0,0 +1,63 @@
+import threading
+from dataclasses import replace
+from typing import Optional
+
+import chess
+import chess.syzygy
+
+from model.TablebaseStats import TablebaseStats
+
+# a tablebase win scores just below a mate on the evaluation scale, sooner wins score higher
+TABLEBASE_WIN_VALUE = 10_000
+
+
+class SyzygyTablebase:
+    """
+    Probes local Syzygy tablebase files for positions with few enough pieces.
+    Results are given in the format of Stockfish.get_evaluation(), so they can stand in for an engine search.
+    """
+
+    def __init__(self, *, directory: str, max_pieces: int = 5):
+        self.__max_pieces = max_pieces
+        self.__tablebase = chess.syzygy.open_tablebase(directory)
+        self.__stats = TablebaseStats()
+        # probing reads shared table files and evaluations may run on several threads at once
+        self.__lock = threading.Lock()
+
+    def close(self) -> None:
+        self.__tablebase.close()
+
+    def get_evaluation(self, fen: str) -> Optional[dict]:
+        """
+        Returns the evaluation of the given position from white's point of view.
+        Returns None if the position has too many pieces, castling rights or no table to probe.
+        """
+        board = chess.Board(fen)
+        if chess.popcount(board.occupied) > self.__max_pieces or board.castling_rights:
+            return None
+
+        with self.__lock:
+            try:
+                wdl = self.__tablebase.probe_wdl(board)
+                dtz = self.__tablebase.probe_dtz(board)
+            except KeyError:
+                # no table for this material
+                self.__stats.misses += 1
+                return None
+            self.__stats.hits += 1
+
+        # cursed wins and blessed losses are draws under the 50 move rule
+        if abs(wdl) < 2:
+            value = 0
+        else:
+            value = TABLEBASE_WIN_VALUE - abs(dtz) if wdl > 0 else -TABLEBASE_WIN_VALUE + abs(dtz)
+        # the tablebase scores for the side to move
+        return {"type": "cp", "value": value if board.turn == chess.WHITE else -value}
+
+    def get_stats(self) -> TablebaseStats:
+        with self.__lock:
+            return replace(self.__stats)
+
+    def reset_stats(self) -> None:
+        with self.__lock:
+            self.__stats = TablebaseStats()
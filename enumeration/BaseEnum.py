@@ -2,6 +2,9 @@ from __future__ import annotations
 
 from abc import abstractmethod
 from enum import Enum, unique
+from typing import TypeVar
+
+BaseEnumT = TypeVar("BaseEnumT", bound="BaseEnum")
 
 
 @unique
@@ -18,5 +21,29 @@ class BaseEnum(Enum):
         ...
 
     @classmethod
-    def from_str(cls, s: str) -> BaseEnum:
-        ...
+    def from_str(cls: type[BaseEnumT], s: str) -> BaseEnumT:
+        """
+        Case insensitive, accepts any of the strings _get_from_str_keys gives for a member.
+        """
+        members_by_string = _MEMBERS_BY_STRING_BY_ENUM.get(cls)
+        if members_by_string is None:
+            # built once per enum so from_str is a single dict lookup
+            members_by_string = {
+                string: member for member in cls for string in cls._get_from_str_keys(member)
+            }
+            _MEMBERS_BY_STRING_BY_ENUM[cls] = members_by_string
+        member = members_by_string.get(s.upper())
+        if member is None:
+            raise ValueError(f"'{s}' is not a valid {cls.__name__}.")
+        return member
+
+    @classmethod
+    def _get_from_str_keys(cls, member: BaseEnum) -> tuple[str, ...]:
+        """
+        The upper case strings from_str accepts for the given member, its value by default.
+        Enums override this to match on the name instead or to add aliases.
+        """
+        return (member.value.upper(),)
+
+
+_MEMBERS_BY_STRING_BY_ENUM: dict[type[BaseEnum], dict[str, BaseEnum]] = {}
@@ -13,10 +13,3 @@ class ChessColor(BaseEnum):
     @staticmethod
     def items() -> list[tuple[ChessColor, str]]:
         return [(member, member.name) for member in ChessColor]
-
-    @classmethod
-    def from_str(cls, s: str) -> ChessColor:
-        for member, _ in ChessColor.items():
-            if member.value.upper() == s.upper():
-                return member
-        raise ValueError(f"'{s}' is not a valid ChessColor.")
@@ -16,9 +16,5 @@ class ChessGameOutcome(BaseEnum):
         return [(member, member.name) for member in ChessGameOutcome]
 
     @classmethod
-    def from_str(cls, s: str) -> ChessGameOutcome:
-        s_upper = s.upper()
-        for member, member_name in ChessGameOutcome.items():
-            if member_name == s_upper:
-                return member
-        raise ValueError(f"'{s}' is not a valid ChessGameOutcome.")
+    def _get_from_str_keys(cls, member: ChessGameOutcome) -> tuple[str, ...]:
+        return (member.name,)
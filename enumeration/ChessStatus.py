@@ -19,9 +19,6 @@ class ChessStatus(BaseEnum):
         return [(member, member.name) for member in ChessStatus]
 
     @classmethod
-    def from_str(cls, s: str) -> ChessStatus:
-        for member, _ in ChessStatus.items():
-            valid_strings = [member.value.upper(), member.value.upper().replace("_", "")]
-            if s.upper() in valid_strings:
-                return member
-        raise ValueError(f"'{s}' is not a valid ChessStatus.")
+    def _get_from_str_keys(cls, member: ChessStatus) -> tuple[str, ...]:
+        # Lichess sends some values without underscores, e.g. "outoftime"
+        return (member.value.upper(), member.value.upper().replace("_", ""))
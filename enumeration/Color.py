@@ -16,9 +16,6 @@ class Color(BaseEnum):
         return [(member, member.name) for member in Color]
 
     @classmethod
-    def from_str(cls, s: str) -> Color:
-        for member, _ in Color.items():
-            valid_strings = [member.value.upper(), member.value.upper().replace("_", "")]
-            if s.upper() in valid_strings:
-                return member
-        raise ValueError(f"'{s}' is not a valid Color.")
+    def _get_from_str_keys(cls, member: Color) -> tuple[str, ...]:
+        # with or without underscores
+        return (member.value.upper(), member.value.upper().replace("_", ""))
@@ -25,9 +25,5 @@ class HexColor(BaseEnum):
         return [(member, member.name) for member in HexColor]
 
     @classmethod
-    def from_str(cls, s: str) -> HexColor:
-        s_upper = s.upper()
-        for member, member_name in HexColor.items():
-            if member_name == s_upper:
-                return member
-        raise ValueError(f"'{s}' is not a valid HexColor.")
+    def _get_from_str_keys(cls, member: HexColor) -> tuple[str, ...]:
+        return (member.name,)
@@ -26,9 +26,5 @@ class PerfType(BaseEnum):
         return [(member, member.name) for member in PerfType]
 
     @classmethod
-    def from_str(cls, s: str) -> PerfType:
-        s_upper = s.upper()
-        for member, member_name in PerfType.items():
-            if member_name == s_upper:
-                return member
-        raise ValueError(f"'{s}' is not a valid PerfType.")
+    def _get_from_str_keys(cls, member: PerfType) -> tuple[str, ...]:
+        return (member.name,)
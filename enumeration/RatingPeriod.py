@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from enum import unique
+
+from enumeration.BaseEnum import BaseEnum
+
+
+@unique
+class RatingPeriod(BaseEnum):
+    DAY = "DAY"
+    WEEK = "WEEK"
+
+    @staticmethod
+    def items() -> list[tuple[RatingPeriod, str]]:
+        return [(member, member.name) for member in RatingPeriod]
@@ -15,9 +15,5 @@ class Sort(BaseEnum):
         return [(member, member.name) for member in Sort]
 
     @classmethod
-    def from_str(cls, s: str) -> Sort:
-        s_upper = s.upper()
-        for member, member_name in Sort.items():
-            if member_name == s_upper:
-                return member
-        raise ValueError(f"'{s}' is not a valid Sort.")
+    def _get_from_str_keys(cls, member: Sort) -> tuple[str, ...]:
+        return (member.name,)
@@ -2,15 +2,18 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
-from model.abstract.DictDeserializable import DictDeserializable
+from model.abstract.Dictizable import Dictizable
 
 
 @dataclass(kw_only=True)
-class ChessClock(DictDeserializable):
+class ChessClock(Dictizable):
     initial: int
     increment: int
     total_time: int
 
+    def to_dict(self) -> dict:
+        return {"initial": self.initial, "increment": self.increment, "totalTime": self.total_time}
+
     @staticmethod
     def from_dict(d: dict) -> ChessClock:
         return ChessClock(initial=d["initial"], increment=d["increment"], total_time=d["totalTime"])
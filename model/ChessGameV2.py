@@ -1,20 +1,25 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
+from datetime import date, datetime, timezone
 from typing import Optional
 
+import chess.pgn
+
 from enumeration.ChessColor import ChessColor
 from enumeration.ChessGameOutcome import ChessGameOutcome
 from enumeration.ChessStatus import ChessStatus
-from model.abstract.DictDeserializable import DictDeserializable
+from model.abstract.Dictizable import Dictizable
 from model.ChessClock import ChessClock
 from model.ChessOpening import ChessOpening
 from model.ChessPlayer import ChessPlayer
 from model.ChessPlayers import ChessPlayers
+from model.ChessUser import ChessUser
+from model.MoveAnalysis import MoveAnalysis
 
 
 @dataclass(kw_only=True)
-class ChessGameV2(DictDeserializable):
+class ChessGameV2(Dictizable):
     id: str
     rated: bool
     variant: str  # TODO: enum
@@ -29,11 +34,29 @@ class ChessGameV2(DictDeserializable):
     moves: str
     clock: ChessClock
     last_fen: str
+    # only given when the game was exported with evals and has been analysed on Lichess
+    analysis: Optional[list[MoveAnalysis]] = None
+
+    def __eq__(self, other: object) -> bool:
+        """
+        Compares the fields, so a LazyChessGameV2 or a GameTableRow equals a ChessGameV2 holding the same game.
+        The generated dataclass __eq__ would also require the exact same class.
+        """
+        if not isinstance(other, ChessGameV2):
+            return NotImplemented
+        return all(getattr(self, f.name) == getattr(other, f.name) for f in fields(ChessGameV2))
 
     @property
     def game_url(self) -> str:
         return f"https://lichess.org/{self.id}"
 
+    @property
+    def last_move_day(self) -> date:
+        """
+        The UTC day the game ended on.
+        """
+        return datetime.fromtimestamp(self.last_move_at / 1000, tz=timezone.utc).date()
+
     @property
     def ended_in_draw(self) -> bool:
         return self.status in (ChessStatus.DRAW, ChessStatus.STALEMATE)
@@ -99,11 +122,120 @@ class ChessGameV2(DictDeserializable):
             color = ChessColor.BLACK
         return color
 
+    def to_dict(self) -> dict:
+        d = {
+            "id": self.id,
+            "rated": self.rated,
+            "variant": self.variant,
+            "speed": self.speed,
+            "perf": self.perf,
+            "createdAt": self.created_at,
+            "lastMoveAt": self.last_move_at,
+            "status": self.status.value.lower().replace("_", ""),
+            "players": self.players.to_dict(),
+            "opening": self.opening.to_dict(),
+            "moves": self.moves,
+            "clock": self.clock.to_dict(),
+            "lastFen": self.last_fen,
+        }
+        if self.winner is not None:
+            d["winner"] = self.winner.value.lower()
+        if self.analysis is not None:
+            d["analysis"] = [move_analysis.to_dict() for move_analysis in self.analysis]
+        return d
+
     @staticmethod
-    def from_dict(d: dict) -> ChessGameV2:
+    def from_pgn_game(game: chess.pgn.Game) -> ChessGameV2:
+        """
+        Builds a game from a Lichess PGN export.
+        Fields the PGN does not have (opening ply, last move time) are filled in as best as possible.
+        """
+        headers = game.headers
+        board = game.board()
+        moves = []
+        for move in game.mainline_moves():
+            moves.append(board.san(move))
+            board.push(move)
+        # e.g. "Rated Blitz game"
+        event_words = headers.get("Event", "").lower().split(" ")
+        speed = event_words[1] if len(event_words) > 2 else "unknown"
+        created_at = int(
+            datetime.strptime(
+                f"{headers.get('UTCDate', '1970.01.01')} {headers.get('UTCTime', '00:00:00')}",
+                "%Y.%m.%d %H:%M:%S",
+            )
+            .replace(tzinfo=timezone.utc)
+            .timestamp()
+            * 1000
+        )
+
+        winner = None
+        if headers.get("Result") == "1-0":
+            winner = ChessColor.WHITE
+        elif headers.get("Result") == "0-1":
+            winner = ChessColor.BLACK
+
+        termination = headers.get("Termination", "Normal")
+        if board.is_checkmate():
+            status = ChessStatus.MATE
+        elif board.is_stalemate():
+            status = ChessStatus.STALEMATE
+        elif termination == "Time forfeit":
+            status = ChessStatus.OUT_OF_TIME
+        elif termination == "Abandoned":
+            status = ChessStatus.TIMEOUT
+        elif winner is None:
+            status = ChessStatus.DRAW
+        else:
+            status = ChessStatus.RESIGN
+
+        initial, increment = 0, 0
+        if "+" in headers.get("TimeControl", ""):
+            initial, increment = (int(part) for part in headers["TimeControl"].split("+"))
+
+        def player(color: str) -> ChessPlayer:
+            name = headers.get(color, "?")
+            return ChessPlayer(
+                user=ChessUser(name=name, id=name.lower()),
+                rating=int(headers.get(f"{color}Elo", "0").replace("?", "0")),
+                rating_diff=int(headers.get(f"{color}RatingDiff", "0")),
+            )
+
+        return ChessGameV2(
+            id=headers.get("Site", "").split("/")[-1],
+            rated=event_words[0] == "rated",
+            variant=headers.get("Variant", "Standard").lower(),
+            speed=speed,
+            perf=speed,
+            created_at=created_at,
+            last_move_at=created_at,
+            status=status,
+            players=ChessPlayers(white=player("White"), black=player("Black")),
+            winner=winner,
+            opening=ChessOpening(
+                eco=headers.get("ECO", "?"), name=headers.get("Opening", "?"), ply=0
+            ),
+            moves=" ".join(moves),
+            # lichess estimates a game's total time using 40 moves
+            clock=ChessClock(
+                initial=initial, increment=increment, total_time=initial + 40 * increment
+            ),
+            last_fen=board.fen(),
+        )
+
+    @staticmethod
+    def from_dict(d: dict, *, lazy: bool = False) -> ChessGameV2:
+        """
+        If lazy is True, nested objects and enums are only decoded when first accessed.
+        """
+        if lazy:
+            return LazyChessGameV2(d)
         winner = None
         if d.get("winner") is not None:
             winner = ChessColor.from_str(d["winner"])
+        analysis = None
+        if d.get("analysis") is not None:
+            analysis = [MoveAnalysis.from_dict(move_analysis) for move_analysis in d["analysis"]]
         return ChessGameV2(
             id=d["id"],
             rated=bool(d["rated"]),
@@ -119,4 +251,97 @@ class ChessGameV2(DictDeserializable):
             moves=d["moves"],
             clock=ChessClock.from_dict(d["clock"]),
             last_fen=d["lastFen"],
+            analysis=analysis,
         )
+
+
+class LazyChessGameV2(ChessGameV2):
+    """
+    Keeps the raw game dict and decodes each field on first access.
+    Nested objects and enums are cached once decoded.
+    """
+
+    def __init__(self, d: dict):
+        self._raw = d
+        self._decoded: dict[str, any] = {}
+
+    @property
+    def id(self) -> str:
+        return self._raw["id"]
+
+    @property
+    def rated(self) -> bool:
+        return bool(self._raw["rated"])
+
+    @property
+    def variant(self) -> str:
+        return self._raw["variant"]
+
+    @property
+    def speed(self) -> str:
+        return self._raw["speed"]
+
+    @property
+    def perf(self) -> str:
+        return self._raw["perf"]
+
+    @property
+    def created_at(self) -> int:
+        return self._raw["createdAt"]
+
+    @property
+    def last_move_at(self) -> int:
+        return self._raw["lastMoveAt"]
+
+    @property
+    def status(self) -> ChessStatus:
+        if "status" not in self._decoded:
+            self._decoded["status"] = ChessStatus.from_str(self._raw["status"])
+        return self._decoded["status"]
+
+    @property
+    def players(self) -> ChessPlayers:
+        if "players" not in self._decoded:
+            self._decoded["players"] = ChessPlayers.from_dict(self._raw["players"])
+        return self._decoded["players"]
+
+    @property
+    def winner(self) -> Optional[ChessColor]:
+        if "winner" not in self._decoded:
+            winner = None
+            if self._raw.get("winner") is not None:
+                winner = ChessColor.from_str(self._raw["winner"])
+            self._decoded["winner"] = winner
+        return self._decoded["winner"]
+
+    @property
+    def opening(self) -> ChessOpening:
+        if "opening" not in self._decoded:
+            self._decoded["opening"] = ChessOpening.from_dict(self._raw["opening"])
+        return self._decoded["opening"]
+
+    @property
+    def moves(self) -> str:
+        return self._raw["moves"]
+
+    @property
+    def clock(self) -> ChessClock:
+        if "clock" not in self._decoded:
+            self._decoded["clock"] = ChessClock.from_dict(self._raw["clock"])
+        return self._decoded["clock"]
+
+    @property
+    def last_fen(self) -> str:
+        return self._raw["lastFen"]
+
+    @property
+    def analysis(self) -> Optional[list[MoveAnalysis]]:
+        if "analysis" not in self._decoded:
+            analysis = None
+            if self._raw.get("analysis") is not None:
+                analysis = [MoveAnalysis.from_dict(m) for m in self._raw["analysis"]]
+            self._decoded["analysis"] = analysis
+        return self._decoded["analysis"]
+
+    def to_dict(self) -> dict:
+        return self._raw
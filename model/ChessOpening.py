@@ -2,15 +2,18 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
-from model.abstract.DictDeserializable import DictDeserializable
+from model.abstract.Dictizable import Dictizable
 
 
 @dataclass(kw_only=True)
-class ChessOpening(DictDeserializable):
+class ChessOpening(Dictizable):
     eco: str
     name: str
     ply: int
 
+    def to_dict(self) -> dict:
+        return {"eco": self.eco, "name": self.name, "ply": self.ply}
+
     @staticmethod
     def from_dict(d: dict) -> ChessOpening:
         return ChessOpening(eco=d["eco"], name=d["name"], ply=d["ply"])
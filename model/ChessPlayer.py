@@ -2,12 +2,12 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
-from model.abstract.DictDeserializable import DictDeserializable
+from model.abstract.Dictizable import Dictizable
 from model.ChessUser import ChessUser
 
 
 @dataclass(kw_only=True)
-class ChessPlayer(DictDeserializable):
+class ChessPlayer(Dictizable):
     user: ChessUser
     rating: int
     rating_diff: int
@@ -16,6 +16,9 @@ class ChessPlayer(DictDeserializable):
     def rating_after_game(self) -> int:
         return self.rating + self.rating_diff
 
+    def to_dict(self) -> dict:
+        return {"user": self.user.to_dict(), "rating": self.rating, "ratingDiff": self.rating_diff}
+
     @staticmethod
     def from_dict(d: dict) -> ChessPlayer:
         return ChessPlayer(
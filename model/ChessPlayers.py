@@ -2,15 +2,18 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
-from model.abstract.DictDeserializable import DictDeserializable
+from model.abstract.Dictizable import Dictizable
 from model.ChessPlayer import ChessPlayer
 
 
 @dataclass(kw_only=True)
-class ChessPlayers(DictDeserializable):
+class ChessPlayers(Dictizable):
     white: ChessPlayer
     black: ChessPlayer
 
+    def to_dict(self) -> dict:
+        return {"white": self.white.to_dict(), "black": self.black.to_dict()}
+
     @staticmethod
     def from_dict(d: dict) -> ChessPlayers:
         return ChessPlayers(
@@ -2,14 +2,17 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
-from model.abstract.DictDeserializable import DictDeserializable
+from model.abstract.Dictizable import Dictizable
 
 
 @dataclass(kw_only=True)
-class ChessUser(DictDeserializable):
+class ChessUser(Dictizable):
     name: str
     id: str
 
+    def to_dict(self) -> dict:
+        return {"name": self.name, "id": self.id}
+
     @staticmethod
     def from_dict(d: dict) -> ChessUser:
         return ChessUser(name=d["name"], id=d["id"])
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from typing import Iterable, Iterator, Optional
+
+from enumeration.ChessColor import ChessColor
+from enumeration.ChessGameOutcome import ChessGameOutcome
+from enumeration.ChessStatus import ChessStatus
+from model.ChessGameV2 import ChessGameV2
+from model.ChessPlayer import ChessPlayer
+from model.UserGameStats import COLORS, OUTCOMES, WHITE_CODE, UserGameStats
+
+
+class GameCollection:
+    """
+    A list of games seen from one user's side.
+    The user's color, outcome and player are worked out once per game when the collection is built.
+    The first filter indexes the games by opening name, status, outcome and color, after which filtering on them is a dict lookup.
+    Filtering returns another GameCollection, which reuses what was already worked out.
+    """
+
+    def __init__(
+        self,
+        *,
+        username: str,
+        games: list[ChessGameV2],
+        players: list[ChessPlayer],
+        statuses: list[ChessStatus],
+        stats: UserGameStats,
+    ):
+        self.username = username
+        self.games = games
+        self.stats = stats  # index i of each column is games[i]
+        self.__players = players
+        self.__statuses = statuses
+
+        # key -> indexes of the games with that key, in game order, built on the first filter
+        self.__indexes_by_opening_name: Optional[dict[str, list[int]]] = None
+        self.__indexes_by_status: dict[ChessStatus, list[int]] = {}
+        self.__indexes_by_outcome: dict[ChessGameOutcome, list[int]] = {}
+        self.__indexes_by_color: dict[ChessColor, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.games)
+
+    def __getitem__(self, index: int) -> ChessGameV2:
+        return self.games[index]
+
+    def __iter__(self) -> Iterator[ChessGameV2]:
+        return iter(self.games)
+
+    @staticmethod
+    def from_games(games: Iterable[ChessGameV2], *, username: str) -> GameCollection:
+        """
+        Raises an Exception if the user did not play in one of the games.
+        """
+        games = list(games)
+        # the user's side of each game is worked out by UserGameStats, the player is picked by its color column
+        stats = UserGameStats.from_games(games, username)
+        players = []
+        statuses = []
+        for game, color in zip(games, stats.colors):
+            chess_players = game.players
+            players.append(chess_players.white if color == WHITE_CODE else chess_players.black)
+            statuses.append(game.status)
+        return GameCollection(
+            username=username, games=games, players=players, statuses=statuses, stats=stats
+        )
+
+    def get_color(self, index: int) -> ChessColor:
+        return COLORS[self.stats.colors[index]]
+
+    def get_outcome(self, index: int) -> ChessGameOutcome:
+        return OUTCOMES[self.stats.outcomes[index]]
+
+    def get_player(self, index: int) -> ChessPlayer:
+        return self.__players[index]
+
+    def get_games_with_opening(self, opening_name: str) -> GameCollection:
+        self.__build_indexes()
+        return self.__take(self.__indexes_by_opening_name.get(opening_name, []))
+
+    def get_games_with_status(self, status: ChessStatus) -> GameCollection:
+        self.__build_indexes()
+        return self.__take(self.__indexes_by_status.get(status, []))
+
+    def get_games_with_outcome(self, outcome: ChessGameOutcome) -> GameCollection:
+        self.__build_indexes()
+        return self.__take(self.__indexes_by_outcome.get(outcome, []))
+
+    def get_games_with_color(self, color: ChessColor) -> GameCollection:
+        self.__build_indexes()
+        return self.__take(self.__indexes_by_color.get(color, []))
+
+    def __build_indexes(self) -> None:
+        if self.__indexes_by_opening_name is not None:
+            return
+        self.__indexes_by_opening_name = {}
+        stats = self.stats
+        opening_names = [opening.name for opening in stats.openings]
+        for i, (opening_code, color, outcome, status) in enumerate(
+            zip(stats.opening_codes, stats.colors, stats.outcomes, self.__statuses)
+        ):
+            self.__indexes_by_opening_name.setdefault(opening_names[opening_code], []).append(i)
+            self.__indexes_by_status.setdefault(status, []).append(i)
+            self.__indexes_by_outcome.setdefault(OUTCOMES[outcome], []).append(i)
+            self.__indexes_by_color.setdefault(COLORS[color], []).append(i)
+
+    def __take(self, indexes: list[int]) -> GameCollection:
+        return GameCollection(
+            username=self.username,
+            games=[self.games[i] for i in indexes],
+            players=[self.__players[i] for i in indexes],
+            statuses=[self.__statuses[i] for i in indexes],
+            stats=self.stats.take(indexes),
+        )
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+from array import array
+from typing import Iterable, Iterator, Optional
+
+from enumeration.ChessColor import ChessColor
+from enumeration.ChessStatus import ChessStatus
+from model.ChessClock import ChessClock
+from model.ChessGameV2 import ChessGameV2
+from model.ChessOpening import ChessOpening
+from model.ChessPlayer import ChessPlayer
+from model.ChessPlayers import ChessPlayers
+from model.ChessUser import ChessUser
+from model.MoveAnalysis import MoveAnalysis
+
+# codes stored in the status and winner columns
+STATUSES: list[ChessStatus] = [status for status in ChessStatus]
+WINNERS: list[Optional[ChessColor]] = [None, ChessColor.WHITE, ChessColor.BLACK]
+NO_WINNER_CODE = 0
+WHITE_WINNER_CODE = 1
+BLACK_WINNER_CODE = 2
+
+
+class GameTable:
+    """
+    Columnar storage for a large number of games.
+    Numeric fields live in compact arrays and repeated strings (users, openings, variants, etc.) are interned.
+    Indexing returns a GameTableRow, which behaves like a ChessGameV2.
+    """
+
+    def __init__(self):
+        self.ids: list[str] = []
+        self.rated = array("b")
+        self.variant_codes = array("H")
+        self.speed_codes = array("H")
+        self.perf_codes = array("H")
+        self.created_at = array("q")
+        self.last_move_at = array("q")
+        self.status_codes = array("b")
+        self.winner_codes = array("b")
+        self.white_user_codes = array("I")
+        self.black_user_codes = array("I")
+        self.white_ratings = array("i")
+        self.black_ratings = array("i")
+        self.white_rating_diffs = array("i")
+        self.black_rating_diffs = array("i")
+        self.opening_codes = array("I")
+        self.clock_initials = array("i")
+        self.clock_increments = array("i")
+        self.clock_total_times = array("i")
+        self.moves: list[str] = []
+        self.last_fens: list[str] = []
+        # raw analysis entries, decoded on access since few games have them
+        self.analyses: list[Optional[list[dict]]] = []
+
+        # interned string tables, the code columns index into these
+        self.labels: list[str] = []
+        self.users: list[ChessUser] = []
+        self.openings: list[ChessOpening] = []
+        self.__label_codes: dict[str, int] = {}
+        self.__user_codes: dict[str, int] = {}
+        self.__opening_codes: dict[tuple[str, str, int], int] = {}
+        self.__status_codes = {status: code for code, status in enumerate(STATUSES)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> GameTableRow:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("GameTable index out of range")
+        return GameTableRow(self, index)
+
+    def __iter__(self) -> Iterator[GameTableRow]:
+        for index in range(len(self)):
+            yield GameTableRow(self, index)
+
+    def append(self, d: dict) -> None:
+        """
+        Appends a game in the Lichess NDJSON export format.
+        """
+        white = d["players"]["white"]
+        black = d["players"]["black"]
+        opening = d["opening"]
+        clock = d["clock"]
+
+        winner_code = NO_WINNER_CODE
+        if d.get("winner") is not None:
+            winner_code = (
+                WHITE_WINNER_CODE
+                if ChessColor.from_str(d["winner"]) == ChessColor.WHITE
+                else BLACK_WINNER_CODE
+            )
+
+        self.ids.append(d["id"])
+        self.rated.append(bool(d["rated"]))
+        self.variant_codes.append(self.__intern_label(d["variant"]))
+        self.speed_codes.append(self.__intern_label(d["speed"]))
+        self.perf_codes.append(self.__intern_label(d["perf"]))
+        self.created_at.append(d["createdAt"])
+        self.last_move_at.append(d["lastMoveAt"])
+        self.status_codes.append(self.__status_codes[ChessStatus.from_str(d["status"])])
+        self.winner_codes.append(winner_code)
+        self.white_user_codes.append(self.__intern_user(white["user"]))
+        self.black_user_codes.append(self.__intern_user(black["user"]))
+        self.white_ratings.append(white["rating"])
+        self.black_ratings.append(black["rating"])
+        self.white_rating_diffs.append(white["ratingDiff"])
+        self.black_rating_diffs.append(black["ratingDiff"])
+        self.opening_codes.append(self.__intern_opening(opening))
+        self.clock_initials.append(clock["initial"])
+        self.clock_increments.append(clock["increment"])
+        self.clock_total_times.append(clock["totalTime"])
+        self.moves.append(d["moves"])
+        self.last_fens.append(d["lastFen"])
+        self.analyses.append(d.get("analysis"))
+
+    def extend(self, dicts: Iterable[dict]) -> None:
+        for d in dicts:
+            self.append(d)
+
+    @staticmethod
+    def from_dicts(dicts: Iterable[dict]) -> GameTable:
+        """
+        Builds a table from games in the Lichess NDJSON export format.
+        Works with a stream, so no more than one game dict needs to be held at a time.
+        """
+        game_table = GameTable()
+        game_table.extend(dicts)
+        return game_table
+
+    def __intern_label(self, label: str) -> int:
+        code = self.__label_codes.get(label)
+        if code is None:
+            code = len(self.labels)
+            self.labels.append(label)
+            self.__label_codes[label] = code
+        return code
+
+    def __intern_user(self, d: dict) -> int:
+        code = self.__user_codes.get(d["id"])
+        if code is None:
+            code = len(self.users)
+            self.users.append(ChessUser.from_dict(d))
+            self.__user_codes[d["id"]] = code
+        return code
+
+    def __intern_opening(self, d: dict) -> int:
+        key = (d["eco"], d["name"], d["ply"])
+        code = self.__opening_codes.get(key)
+        if code is None:
+            code = len(self.openings)
+            self.openings.append(ChessOpening.from_dict(d))
+            self.__opening_codes[key] = code
+        return code
+
+
+class GameTableRow(ChessGameV2):
+    """
+    A view of one game in a GameTable.
+    Fields are read from the table's columns on access, so all ChessGameV2 properties and methods work unchanged.
+    It compares equal to a ChessGameV2 or LazyChessGameV2 holding the same game, see ChessGameV2.__eq__.
+    """
+
+    def __init__(self, table: GameTable, index: int):
+        self._table = table
+        self._index = index
+
+    @property
+    def id(self) -> str:
+        return self._table.ids[self._index]
+
+    @property
+    def rated(self) -> bool:
+        return bool(self._table.rated[self._index])
+
+    @property
+    def variant(self) -> str:
+        return self._table.labels[self._table.variant_codes[self._index]]
+
+    @property
+    def speed(self) -> str:
+        return self._table.labels[self._table.speed_codes[self._index]]
+
+    @property
+    def perf(self) -> str:
+        return self._table.labels[self._table.perf_codes[self._index]]
+
+    @property
+    def created_at(self) -> int:
+        return self._table.created_at[self._index]
+
+    @property
+    def last_move_at(self) -> int:
+        return self._table.last_move_at[self._index]
+
+    @property
+    def status(self) -> ChessStatus:
+        return STATUSES[self._table.status_codes[self._index]]
+
+    @property
+    def players(self) -> ChessPlayers:
+        table = self._table
+        i = self._index
+        return ChessPlayers(
+            white=ChessPlayer(
+                user=table.users[table.white_user_codes[i]],
+                rating=table.white_ratings[i],
+                rating_diff=table.white_rating_diffs[i],
+            ),
+            black=ChessPlayer(
+                user=table.users[table.black_user_codes[i]],
+                rating=table.black_ratings[i],
+                rating_diff=table.black_rating_diffs[i],
+            ),
+        )
+
+    @property
+    def winner(self) -> Optional[ChessColor]:
+        return WINNERS[self._table.winner_codes[self._index]]
+
+    @property
+    def opening(self) -> ChessOpening:
+        return self._table.openings[self._table.opening_codes[self._index]]
+
+    @property
+    def moves(self) -> str:
+        return self._table.moves[self._index]
+
+    @property
+    def clock(self) -> ChessClock:
+        return ChessClock(
+            initial=self._table.clock_initials[self._index],
+            increment=self._table.clock_increments[self._index],
+            total_time=self._table.clock_total_times[self._index],
+        )
+
+    @property
+    def last_fen(self) -> str:
+        return self._table.last_fens[self._index]
+
+    @property
+    def analysis(self) -> Optional[list[MoveAnalysis]]:
+        analysis = self._table.analyses[self._index]
+        if analysis is None:
+            return None
+        return [MoveAnalysis.from_dict(move_analysis) for move_analysis in analysis]
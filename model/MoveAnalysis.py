@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+from model.abstract.Dictizable import Dictizable
+from model.MoveJudgment import MoveJudgment
+
+
+@dataclass(kw_only=True)
+class MoveAnalysis(Dictizable):
+    """
+    Lichess's server analysis of the position after one move.
+    Scores are from white's perspective. best, variation and judgment are only given for judged moves.
+    """
+
+    eval: Optional[int] = None
+    mate: Optional[int] = None
+    best: Optional[str] = None  # uci of the move that should have been played instead
+    variation: Optional[str] = None
+    judgment: Optional[MoveJudgment] = None
+
+    @property
+    def raw_eval(self) -> Optional[dict]:
+        """
+        Returns the score in the format of Stockfish.get_evaluation(), or None if there is no score.
+        """
+        if self.mate is not None:
+            return {"type": "mate", "value": self.mate}
+        if self.eval is not None:
+            return {"type": "cp", "value": self.eval}
+        return None
+
+    def to_dict(self) -> dict:
+        d = {}
+        if self.eval is not None:
+            d["eval"] = self.eval
+        if self.mate is not None:
+            d["mate"] = self.mate
+        if self.best is not None:
+            d["best"] = self.best
+        if self.variation is not None:
+            d["variation"] = self.variation
+        if self.judgment is not None:
+            d["judgment"] = self.judgment.to_dict()
+        return d
+
+    @staticmethod
+    def from_dict(d: dict) -> MoveAnalysis:
+        judgment = None
+        if d.get("judgment") is not None:
+            judgment = MoveJudgment.from_dict(d["judgment"])
+        return MoveAnalysis(
+            eval=d.get("eval"),
+            mate=d.get("mate"),
+            best=d.get("best"),
+            variation=d.get("variation"),
+            judgment=judgment,
+        )
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from model.abstract.Dictizable import Dictizable
+
+
+@dataclass(kw_only=True)
+class MoveJudgment(Dictizable):
+    name: str  # Inaccuracy, Mistake or Blunder
+    comment: str
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "comment": self.comment}
+
+    @staticmethod
+    def from_dict(d: dict) -> MoveJudgment:
+        return MoveJudgment(name=d["name"], comment=d["comment"])
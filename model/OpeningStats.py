@@ -0,0 +1,18 @@
+from dataclasses import dataclass
+
+from enumeration.ChessColor import ChessColor
+
+
+@dataclass(kw_only=True)
+class OpeningStats:
+    """
+    Totals for the games a user played with one opening and color over a window of days.
+    """
+
+    opening_name: str
+    player_color: ChessColor
+    games: int
+    wins: int
+    losses: int
+    ties: int
+    net_elo: int
@@ -0,0 +1,9 @@
+from dataclasses import dataclass
+
+
+@dataclass(kw_only=True)
+class PlayedMove:
+    ply: int  # 1 for white's first move, 2 for black's first move, etc
+    move: str  # uci
+    fen_before_move: str
+    fen_after_move: str
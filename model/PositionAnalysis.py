@@ -0,0 +1,9 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass(kw_only=True)
+class PositionAnalysis:
+    evaluation: dict  # same format as Stockfish.get_evaluation(), from white's perspective
+    best_move: Optional[str]
+    lines: list[dict] = field(default_factory=list)  # same format as Stockfish.get_top_moves()
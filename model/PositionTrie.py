@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import threading
+from typing import Callable, Iterable, Optional
+
+import chess
+
+from enumeration.ChessColor import ChessColor
+from model.ChessGameV2 import ChessGameV2
+from model.PlayedMove import PlayedMove
+
+
+class PositionTrie:
+    """
+    A tree of the positions reached by a set of games, branching on each move.
+    Games that share their first moves share the nodes for those positions, so each position is replayed
+    (and, through PositionTrieNode.get_evaluation, evaluated) once no matter how many games pass through it.
+    """
+
+    def __init__(self):
+        self.root = PositionTrieNode(fen=chess.STARTING_FEN, move=None)
+        self.__num_positions = 1
+        self.__num_plies = 0
+        # game id -> path, so a game already in the tree is not walked again
+        self.__paths: dict[str, list[PositionTrieNode]] = {}
+        # games may be added on several threads at once
+        self.__lock = threading.Lock()
+
+    @property
+    def num_positions(self) -> int:
+        """
+        The number of unique positions in the tree, including the starting position.
+        """
+        return self.__num_positions
+
+    @property
+    def num_plies(self) -> int:
+        """
+        The number of plies across all games added to the tree.
+        """
+        return self.__num_plies
+
+    def add_game(self, chess_game: ChessGameV2) -> list[PositionTrieNode]:
+        """
+        Adds the given game and returns its path, the node for the position after each ply.
+        The first node is the starting position, so path[ply] is the position after that ply.
+        A game that is already in the tree is not added again, its path is returned as is.
+        """
+        with self.__lock:
+            path = self.__paths.get(chess_game.id)
+            if path is not None:
+                return path
+            node = self.root
+            path = [node]
+            for move in chess_game.moves.split(" "):
+                child = node.children.get(move)
+                if child is None:
+                    board = chess.Board(node.fen)
+                    uci_move = board.push_san(move).uci()
+                    child = PositionTrieNode(fen=board.fen(), move=uci_move)
+                    node.children[move] = child
+                    self.__num_positions += 1
+                node = child
+                path.append(node)
+            self.__num_plies += len(path) - 1
+            self.__paths[chess_game.id] = path
+            return path
+
+    def get_path(self, chess_game: ChessGameV2) -> list[PositionTrieNode]:
+        """
+        Returns the path of a game added by from_games or add_game, adding the game only if it is not in the tree yet.
+        """
+        path = self.__paths.get(chess_game.id)
+        if path is None:
+            path = self.add_game(chess_game)
+        return path
+
+    @staticmethod
+    def get_played_moves(path: list[PositionTrieNode], *, color: ChessColor) -> list[PlayedMove]:
+        """
+        Returns every move played by the given color along a path returned by add_game.
+        Same as service.evaluate_game.get_played_moves, without replaying the game.
+        """
+        first_ply = 1 if color == ChessColor.WHITE else 2
+        return [
+            PlayedMove(
+                ply=ply,
+                move=path[ply].move,
+                fen_before_move=path[ply - 1].fen,
+                fen_after_move=path[ply].fen,
+            )
+            for ply in range(first_ply, len(path), 2)
+        ]
+
+    @staticmethod
+    def from_games(chess_games: Iterable[ChessGameV2]) -> PositionTrie:
+        position_trie = PositionTrie()
+        for chess_game in chess_games:
+            position_trie.add_game(chess_game)
+        return position_trie
+
+
+class PositionTrieNode:
+    """
+    One position in a PositionTrie.
+    Keeps the deepest evaluation of the position made so far.
+    """
+
+    __slots__ = ("fen", "move", "children", "_evaluation", "_evaluation_depth", "_lock")
+
+    def __init__(self, *, fen: str, move: Optional[str]):
+        self.fen = fen
+        self.move = move  # uci of the move that led here, None for the starting position
+        self.children: dict[str, PositionTrieNode] = {}  # keyed by san
+        self._evaluation: Optional[dict] = None
+        self._evaluation_depth = 0
+        self._lock = threading.Lock()
+
+    def get_evaluation(self, depth: int, evaluate: Callable[[], dict]) -> dict:
+        """
+        Returns this position's evaluation at the given depth or deeper, calling evaluate only if there is none yet.
+        Games evaluated at the same time wait for each other instead of searching the same position twice.
+        """
+        with self._lock:
+            if self._evaluation is None or self._evaluation_depth < depth:
+                self._evaluation = evaluate()
+                self._evaluation_depth = depth
+            return self._evaluation
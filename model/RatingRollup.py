@@ -0,0 +1,15 @@
+from dataclasses import dataclass
+from datetime import date
+
+
+@dataclass(kw_only=True)
+class RatingRollup:
+    """
+    A user's rating over one day or week, counting the ratings before and after each game.
+    """
+
+    start_day: date  # the day, or the Monday of the week
+    min_rating: int
+    max_rating: int
+    close_rating: int  # after the last game
+    num_games: int
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from enumeration.ChessColor import ChessColor
+from enumeration.ChessGameOutcome import ChessGameOutcome
+from enumeration.ChessStatus import ChessStatus
+from model.ChessGameV2 import ChessGameV2
+from model.OpeningInfo import OpeningInfo
+from model.UserGameStats import COLORS, OUTCOMES, get_user_side
+
+
+@dataclass(kw_only=True)
+class _OpeningBucket:
+    """
+    Running totals for every game of one opening, whatever color the user played.
+    """
+
+    wins: int = 0
+    losses: int = 0
+    ties: int = 0
+    total_rating_change: int = 0
+    # (-rating change, -game number, game) for the games that lost the most rating, kept as a max heap
+    worst_games: list[tuple[int, int, ChessGameV2]] = field(default_factory=list)
+
+
+class ReportAggregator:
+    """
+    Builds everything the daily report needs from one pass over a user's games, newest game first.
+    Games can come from a stream, only running totals and the few games the report links to are kept.
+    """
+
+    def __init__(
+        self, *, username: str, max_losses_to_evaluate: int, max_worst_games_per_opening: int = 5
+    ):
+        self.username = username
+        self.__max_losses_to_evaluate = max_losses_to_evaluate
+        self.__max_worst_games_per_opening = max_worst_games_per_opening
+
+        self.num_games = 0
+        # status -> outcome -> number of games, keyed by the enum values
+        self.status_counts: dict[str, dict[str, int]] = {
+            status: {outcome: 0 for _, outcome in ChessGameOutcome.items()}
+            for _, status in ChessStatus.items()
+        }
+        self.highest_elo_beat: Optional[int] = None
+        self.highest_elo_beat_username: Optional[str] = None
+        self.lowest_elo_lost: Optional[int] = None
+        self.lowest_elo_lost_username: Optional[str] = None
+        # the user's rating before the oldest game and after the newest game
+        self.starting_elo: Optional[int] = None
+        self.ending_elo: Optional[int] = None
+        self.losses_to_evaluate: list[ChessGameV2] = []
+
+        # (opening name, color) -> [opening, net elo, outcomes], in the order each first appears
+        self.__opening_infos: dict[tuple[str, ChessColor], list] = {}
+        self.__opening_buckets: dict[str, _OpeningBucket] = {}
+
+    def add(self, game: ChessGameV2) -> None:
+        color_code, player, opponent, outcome_code = get_user_side(game, self.username)
+        color, outcome = COLORS[color_code], OUTCOMES[outcome_code]
+
+        self.num_games += 1
+        self.status_counts[game.status.value][outcome.value] += 1
+
+        # best win / worst loss
+        if outcome == ChessGameOutcome.WIN and (
+            self.highest_elo_beat is None or opponent.rating > self.highest_elo_beat
+        ):
+            self.highest_elo_beat = opponent.rating
+            self.highest_elo_beat_username = opponent.user.name
+        elif outcome == ChessGameOutcome.LOSS and (
+            self.lowest_elo_lost is None or opponent.rating < self.lowest_elo_lost
+        ):
+            self.lowest_elo_lost = opponent.rating
+            self.lowest_elo_lost_username = opponent.user.name
+
+        if self.ending_elo is None:
+            self.ending_elo = player.rating_after_game
+        self.starting_elo = player.rating
+
+        if (
+            outcome == ChessGameOutcome.LOSS
+            and len(self.losses_to_evaluate) < self.__max_losses_to_evaluate
+        ):
+            self.losses_to_evaluate.append(game)
+
+        opening = game.opening
+        opening_info = self.__opening_infos.get((opening.name, color))
+        if opening_info is None:
+            self.__opening_infos[(opening.name, color)] = [opening, player.rating_diff, [outcome]]
+        else:
+            opening_info[1] += player.rating_diff
+            opening_info[2].append(outcome)
+
+        bucket = self.__opening_buckets.get(opening.name)
+        if bucket is None:
+            bucket = self.__opening_buckets[opening.name] = _OpeningBucket()
+        if outcome == ChessGameOutcome.WIN:
+            bucket.wins += 1
+        elif outcome == ChessGameOutcome.LOSS:
+            bucket.losses += 1
+        else:
+            bucket.ties += 1
+        bucket.total_rating_change += player.rating_diff
+        if player.rating_diff <= 0:
+            # keeps the games with the lowest rating change, earlier games first on ties
+            heapq.heappush(bucket.worst_games, (-player.rating_diff, -self.num_games, game))
+            if len(bucket.worst_games) > self.__max_worst_games_per_opening:
+                heapq.heappop(bucket.worst_games)
+
+    def extend(self, games: Iterable[ChessGameV2]) -> None:
+        for game in games:
+            self.add(game)
+
+    @staticmethod
+    def from_games(
+        games: Iterable[ChessGameV2], *, username: str, max_losses_to_evaluate: int
+    ) -> ReportAggregator:
+        report_aggregator = ReportAggregator(
+            username=username, max_losses_to_evaluate=max_losses_to_evaluate
+        )
+        report_aggregator.extend(games)
+        return report_aggregator
+
+    def get_opening_infos(self) -> list[OpeningInfo]:
+        """
+        Returns one OpeningInfo per opening and color, sorted from worst to best net elo.
+        """
+        opening_infos = [
+            OpeningInfo(
+                net_elo=net_elo, chess_opening=opening, player_color=color, player_outcomes=outcomes
+            )
+            for (_, color), (opening, net_elo, outcomes) in self.__opening_infos.items()
+        ]
+        opening_infos.sort(key=lambda opening_info: opening_info.net_elo)
+        return opening_infos
+
+    def get_record_with_opening(self, opening_name: str) -> tuple[int, int, int]:
+        """Returns record as W-L-T"""
+        bucket = self.__opening_buckets[opening_name]
+        return bucket.wins, bucket.losses, bucket.ties
+
+    def get_average_rating_change_with_opening(self, opening_name: str) -> float:
+        bucket = self.__opening_buckets[opening_name]
+        return bucket.total_rating_change / (bucket.wins + bucket.losses + bucket.ties)
+
+    def get_worst_games_with_opening(self, opening_name: str) -> list[ChessGameV2]:
+        """
+        Returns the games with this opening that lost (or did not change) rating, lowest rating change first.
+        """
+        bucket = self.__opening_buckets[opening_name]
+        return [game for _, _, game in sorted(bucket.worst_games, reverse=True)]
@@ -0,0 +1,14 @@
+from dataclasses import dataclass
+
+
+@dataclass(kw_only=True)
+class RestCallStats:
+    calls: int = 0
+    retries: int = 0
+    failures: int = 0
+    total_latency_seconds: float = 0.0
+    last_latency_seconds: float = 0.0
+
+    @property
+    def average_latency_seconds(self) -> float:
+        return self.total_latency_seconds / self.calls if self.calls else 0.0
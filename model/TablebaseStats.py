@@ -0,0 +1,7 @@
+from dataclasses import dataclass
+
+
+@dataclass(kw_only=True)
+class TablebaseStats:
+    hits: int = 0
+    misses: int = 0
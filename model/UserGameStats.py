@@ -0,0 +1,310 @@
+"""
+numpy is optional, the aggregations fall back to plain Python loops over the same columns if it is not installed.
+"""
+from __future__ import annotations
+
+from array import array
+from typing import Iterable
+
+from enumeration.ChessColor import ChessColor
+from enumeration.ChessGameOutcome import ChessGameOutcome
+from enumeration.ChessStatus import ChessStatus
+from model.ChessGameV2 import ChessGameV2
+from model.ChessOpening import ChessOpening
+from model.ChessPlayer import ChessPlayer
+from model.GameTable import NO_WINNER_CODE, STATUSES, GameTable
+from model.OpeningInfo import OpeningInfo
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# codes stored in the colors and outcomes columns
+COLORS = [ChessColor.WHITE, ChessColor.BLACK]
+OUTCOMES = [ChessGameOutcome.WIN, ChessGameOutcome.LOSS, ChessGameOutcome.TIE]
+WHITE_CODE = 0
+BLACK_CODE = 1
+WIN_CODE = 0
+LOSS_CODE = 1
+TIE_CODE = 2
+DRAW_STATUSES = (ChessStatus.DRAW, ChessStatus.STALEMATE)
+
+
+class UserGameStats:
+    """
+    One user's side of a list of games, as columns: color, outcome, rating, rating change and opening.
+    The username is checked once per game while building the columns, then every statistic is an aggregation over them.
+    Index i of each column is game i of the games it was built from.
+    """
+
+    def __init__(
+        self,
+        *,
+        colors: array,
+        outcomes: array,
+        ratings: array,
+        rating_diffs: array,
+        opening_codes: array,
+        openings: list[ChessOpening],
+    ):
+        self.colors = colors
+        self.outcomes = outcomes
+        self.ratings = ratings
+        self.rating_diffs = rating_diffs
+        self.opening_codes = opening_codes  # index into openings, one per opening name
+        self.openings = openings
+
+    def __len__(self) -> int:
+        return len(self.colors)
+
+    @staticmethod
+    def from_games(games: Iterable[ChessGameV2], username: str) -> UserGameStats:
+        """
+        Raises an Exception if the user did not play in one of the games.
+        """
+        if isinstance(games, GameTable):
+            return UserGameStats.__from_game_table(games, username)
+
+        colors, outcomes = array("b"), array("b")
+        ratings, rating_diffs = array("i"), array("i")
+        opening_codes = array("I")
+        openings: list[ChessOpening] = []
+        opening_codes_by_name: dict[str, int] = {}
+        for game in games:
+            color, player, _, outcome = get_user_side(game, username)
+
+            opening = game.opening
+            opening_code = opening_codes_by_name.get(opening.name)
+            if opening_code is None:
+                opening_code = len(openings)
+                openings.append(opening)
+                opening_codes_by_name[opening.name] = opening_code
+
+            colors.append(color)
+            outcomes.append(outcome)
+            ratings.append(player.rating)
+            rating_diffs.append(player.rating_diff)
+            opening_codes.append(opening_code)
+
+        return UserGameStats(
+            colors=colors,
+            outcomes=outcomes,
+            ratings=ratings,
+            rating_diffs=rating_diffs,
+            opening_codes=opening_codes,
+            openings=openings,
+        )
+
+    @staticmethod
+    def __from_game_table(game_table: GameTable, username: str) -> UserGameStats:
+        """
+        Reads the table's columns directly instead of going through a GameTableRow per game.
+        Same rules as get_user_side, applied to the table's codes.
+        """
+        user_codes = {code for code, user in enumerate(game_table.users) if user.name == username}
+        draw_status_codes = {STATUSES.index(status) for status in DRAW_STATUSES}
+
+        # the table interns openings by eco, name and ply, these are interned by name only
+        openings: list[ChessOpening] = []
+        opening_codes_by_name: dict[str, int] = {}
+        opening_code_lookup = array("I")
+        for opening in game_table.openings:
+            if opening.name not in opening_codes_by_name:
+                opening_codes_by_name[opening.name] = len(openings)
+                openings.append(opening)
+            opening_code_lookup.append(opening_codes_by_name[opening.name])
+
+        if numpy is not None:
+            is_white = numpy.isin(_as_numpy(game_table.white_user_codes), list(user_codes))
+            is_black = numpy.isin(_as_numpy(game_table.black_user_codes), list(user_codes))
+            if not numpy.all(is_white | is_black):
+                raise Exception(f"Invalid username '{username}' for game.")
+            colors = numpy.where(is_white, WHITE_CODE, BLACK_CODE).astype(numpy.int8)
+            winner_codes = _as_numpy(game_table.winner_codes)
+            is_tie = numpy.isin(_as_numpy(game_table.status_codes), list(draw_status_codes)) | (
+                winner_codes == NO_WINNER_CODE
+            )
+            # winner codes are one more than color codes
+            outcomes = numpy.where(
+                is_tie, TIE_CODE, numpy.where(winner_codes == colors + 1, WIN_CODE, LOSS_CODE)
+            ).astype(numpy.int8)
+            ratings = numpy.where(
+                is_white, _as_numpy(game_table.white_ratings), _as_numpy(game_table.black_ratings)
+            ).astype(numpy.intc)
+            rating_diffs = numpy.where(
+                is_white,
+                _as_numpy(game_table.white_rating_diffs),
+                _as_numpy(game_table.black_rating_diffs),
+            ).astype(numpy.intc)
+            opening_codes = _as_numpy(opening_code_lookup)[_as_numpy(game_table.opening_codes)]
+            return UserGameStats(
+                colors=array("b", colors.tobytes()),
+                outcomes=array("b", outcomes.tobytes()),
+                ratings=array("i", ratings.tobytes()),
+                rating_diffs=array("i", rating_diffs.tobytes()),
+                opening_codes=array("I", opening_codes.tobytes()),
+                openings=openings,
+            )
+
+        colors, outcomes = array("b"), array("b")
+        ratings, rating_diffs = array("i"), array("i")
+        opening_codes = array("I")
+        for i in range(len(game_table)):
+            if game_table.white_user_codes[i] in user_codes:
+                color = WHITE_CODE
+                ratings.append(game_table.white_ratings[i])
+                rating_diffs.append(game_table.white_rating_diffs[i])
+            elif game_table.black_user_codes[i] in user_codes:
+                color = BLACK_CODE
+                ratings.append(game_table.black_ratings[i])
+                rating_diffs.append(game_table.black_rating_diffs[i])
+            else:
+                raise Exception(f"Invalid username '{username}' for game.")
+            winner_code = game_table.winner_codes[i]
+            if game_table.status_codes[i] in draw_status_codes or winner_code == NO_WINNER_CODE:
+                outcomes.append(TIE_CODE)
+            else:
+                outcomes.append(WIN_CODE if winner_code == color + 1 else LOSS_CODE)
+            colors.append(color)
+            opening_codes.append(opening_code_lookup[game_table.opening_codes[i]])
+
+        return UserGameStats(
+            colors=colors,
+            outcomes=outcomes,
+            ratings=ratings,
+            rating_diffs=rating_diffs,
+            opening_codes=opening_codes,
+            openings=openings,
+        )
+
+    def take(self, indexes: list[int]) -> UserGameStats:
+        """
+        Returns the stats for the games at the given indexes, in that order, without going back to the games.
+        """
+        if numpy is not None:
+            numpy_indexes = numpy.asarray(indexes, dtype=numpy.intp)
+            return UserGameStats(
+                colors=array("b", _as_numpy(self.colors)[numpy_indexes].tobytes()),
+                outcomes=array("b", _as_numpy(self.outcomes)[numpy_indexes].tobytes()),
+                ratings=array("i", _as_numpy(self.ratings)[numpy_indexes].tobytes()),
+                rating_diffs=array("i", _as_numpy(self.rating_diffs)[numpy_indexes].tobytes()),
+                opening_codes=array("I", _as_numpy(self.opening_codes)[numpy_indexes].tobytes()),
+                openings=self.openings,
+            )
+        return UserGameStats(
+            colors=array("b", [self.colors[i] for i in indexes]),
+            outcomes=array("b", [self.outcomes[i] for i in indexes]),
+            ratings=array("i", [self.ratings[i] for i in indexes]),
+            rating_diffs=array("i", [self.rating_diffs[i] for i in indexes]),
+            opening_codes=array("I", [self.opening_codes[i] for i in indexes]),
+            openings=self.openings,
+        )
+
+    def get_record(self) -> tuple[int, int, int]:
+        """
+        Returns record as W-L-T
+        """
+        if numpy is not None:
+            counts = numpy.bincount(_as_numpy(self.outcomes), minlength=len(OUTCOMES))
+            return int(counts[WIN_CODE]), int(counts[LOSS_CODE]), int(counts[TIE_CODE])
+        counts = [0] * len(OUTCOMES)
+        for outcome in self.outcomes:
+            counts[outcome] += 1
+        return counts[WIN_CODE], counts[LOSS_CODE], counts[TIE_CODE]
+
+    def get_average_rating_change(self) -> float:
+        if numpy is not None:
+            total_rating_change = int(_as_numpy(self.rating_diffs).sum(dtype=numpy.int64))
+        else:
+            total_rating_change = sum(self.rating_diffs)
+        return total_rating_change / len(self)
+
+    def get_negative_rating_change_indexes(self, *, include_zero: bool = True) -> list[int]:
+        if numpy is not None:
+            rating_diffs = _as_numpy(self.rating_diffs)
+            mask = rating_diffs <= 0 if include_zero else rating_diffs < 0
+            return numpy.flatnonzero(mask).tolist()
+        if include_zero:
+            return [i for i, rating_diff in enumerate(self.rating_diffs) if rating_diff <= 0]
+        return [i for i, rating_diff in enumerate(self.rating_diffs) if rating_diff < 0]
+
+    def get_opening_infos(self) -> list[OpeningInfo]:
+        """
+        Groups the games by opening and color, in the order each group first appears.
+        """
+        if numpy is not None:
+            # one group per opening and color
+            keys = _as_numpy(self.opening_codes).astype(numpy.int64) * 2 + _as_numpy(self.colors)
+            group_keys, first_indexes = numpy.unique(keys, return_index=True)
+            net_elos = numpy.bincount(
+                numpy.searchsorted(group_keys, keys),
+                weights=_as_numpy(self.rating_diffs),
+                minlength=len(group_keys),
+            )
+            order = numpy.argsort(keys, kind="stable")
+            sorted_outcomes = _as_numpy(self.outcomes)[order]
+            split_at = numpy.flatnonzero(numpy.diff(keys[order])) + 1
+            outcomes_by_group = numpy.split(sorted_outcomes, split_at)
+            opening_infos = []
+            for group in numpy.argsort(first_indexes):
+                key = int(group_keys[group])
+                opening_infos.append(
+                    OpeningInfo(
+                        net_elo=int(net_elos[group]),
+                        chess_opening=self.openings[key // 2],
+                        player_color=COLORS[key % 2],
+                        player_outcomes=[OUTCOMES[code] for code in outcomes_by_group[group]],
+                    )
+                )
+            return opening_infos
+
+        groups: dict[int, list] = {}
+        for opening_code, color, outcome, rating_diff in zip(
+            self.opening_codes, self.colors, self.outcomes, self.rating_diffs
+        ):
+            key = opening_code * 2 + color
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [rating_diff, [OUTCOMES[outcome]]]
+            else:
+                group[0] += rating_diff
+                group[1].append(OUTCOMES[outcome])
+        return [
+            OpeningInfo(
+                net_elo=net_elo,
+                chess_opening=self.openings[key // 2],
+                player_color=COLORS[key % 2],
+                player_outcomes=player_outcomes,
+            )
+            for key, (net_elo, player_outcomes) in groups.items()
+        ]
+
+
+def get_user_side(game: ChessGameV2, username: str) -> tuple[int, ChessPlayer, ChessPlayer, int]:
+    """
+    Returns (color code, the user's player, the opponent's player, outcome code) for the given user in the given game.
+    This is the one place a game is seen from a user's side, GameCollection and ReportAggregator go through it too.
+    Raises an Exception if the user did not play in the game.
+    """
+    players = game.players
+    if players.white.user.name == username:
+        color, player, opponent = WHITE_CODE, players.white, players.black
+    elif players.black.user.name == username:
+        color, player, opponent = BLACK_CODE, players.black, players.white
+    else:
+        raise Exception(f"Invalid username '{username}' for game.")
+
+    winner = game.winner
+    if game.status in DRAW_STATUSES or winner is None:
+        outcome = TIE_CODE
+    else:
+        outcome = WIN_CODE if winner == COLORS[color] else LOSS_CODE
+    return color, player, opponent, outcome
+
+
+def _as_numpy(column: array):
+    """
+    Wraps an array column without copying it.
+    """
+    return numpy.frombuffer(column, dtype=column.typecode)
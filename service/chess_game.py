@@ -1,9 +1,13 @@
-from typing import Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional
 
 from api.LichessApiClient import LichessApiClient
 from enumeration.PerfType import PerfType
 from enumeration.Sort import Sort
 from model.ChessGameV2 import ChessGameV2
+from model.GameTable import GameTable
+from store.GameStore import GameStore
 
 
 def get_games_for_user_v2(
@@ -17,7 +21,9 @@ def get_games_for_user_v2(
     opening: Optional[bool] = None,
     finished: Optional[bool] = None,
     literate: Optional[bool] = None,
-    last_fen: Optional[bool] = None
+    last_fen: Optional[bool] = None,
+    evals: Optional[bool] = None,
+    since: Optional[int] = None,
 ) -> list[ChessGameV2]:
     lichess_api_client = LichessApiClient()
     return lichess_api_client.get_games_for_user_v2(
@@ -31,4 +37,227 @@ def get_games_for_user_v2(
         finished=finished,
         literate=literate,
         last_fen=last_fen,
+        evals=evals,
+        since=since,
     )
+
+
+def stream_games_for_user_v2(
+    username: str,
+    *,
+    max: Optional[int] = None,
+    rated: Optional[bool] = None,
+    perf_type: Optional[PerfType] = None,
+    tags: Optional[bool] = None,
+    sort: Optional[Sort] = None,
+    opening: Optional[bool] = None,
+    finished: Optional[bool] = None,
+    literate: Optional[bool] = None,
+    last_fen: Optional[bool] = None,
+    evals: Optional[bool] = None,
+    since: Optional[int] = None,
+) -> Iterator[ChessGameV2]:
+    lichess_api_client = LichessApiClient()
+    return lichess_api_client.stream_games_for_user_v2(
+        username,
+        max=max,
+        rated=rated,
+        perf_type=perf_type,
+        tags=tags,
+        sort=sort,
+        opening=opening,
+        finished=finished,
+        literate=literate,
+        last_fen=last_fen,
+        evals=evals,
+        since=since,
+    )
+
+
+def get_game_table_for_user_v2(
+    username: str,
+    *,
+    max: Optional[int] = None,
+    rated: Optional[bool] = None,
+    perf_type: Optional[PerfType] = None,
+    tags: Optional[bool] = None,
+    sort: Optional[Sort] = None,
+    opening: Optional[bool] = None,
+    finished: Optional[bool] = None,
+    literate: Optional[bool] = None,
+    last_fen: Optional[bool] = None,
+    evals: Optional[bool] = None,
+    since: Optional[int] = None,
+) -> GameTable:
+    """
+    Builds a columnar GameTable straight from the NDJSON stream, without creating a ChessGameV2 per game.
+    """
+    lichess_api_client = LichessApiClient()
+    return GameTable.from_dicts(
+        lichess_api_client.stream_game_dicts_for_user_v2(
+            username,
+            max=max,
+            rated=rated,
+            perf_type=perf_type,
+            tags=tags,
+            sort=sort,
+            opening=opening,
+            finished=finished,
+            literate=literate,
+            last_fen=last_fen,
+            evals=evals,
+            since=since,
+        )
+    )
+
+
+def get_games_for_users_v2(
+    usernames: list[str],
+    *,
+    max_workers: int,
+    base_url: Optional[str] = None,
+    since_by_username: Optional[dict[str, Optional[int]]] = None,
+    max: Optional[int] = None,
+    rated: Optional[bool] = None,
+    perf_type: Optional[PerfType] = None,
+    tags: Optional[bool] = None,
+    sort: Optional[Sort] = None,
+    opening: Optional[bool] = None,
+    finished: Optional[bool] = None,
+    literate: Optional[bool] = None,
+    last_fen: Optional[bool] = None,
+    evals: Optional[bool] = None,
+    lazy: bool = False,
+) -> dict[str, list[ChessGameV2]]:
+    """
+    Downloads the game streams of all given users concurrently on a bounded thread pool.
+    Returns the games for each username, in the order the usernames were given.
+    """
+    since_by_username = since_by_username or {}
+    lichess_api_client = LichessApiClient(base_url=base_url)
+
+    def get_games(username: str) -> list[ChessGameV2]:
+        return list(
+            lichess_api_client.stream_games_for_user_v2(
+                username,
+                max=max,
+                rated=rated,
+                perf_type=perf_type,
+                tags=tags,
+                sort=sort,
+                opening=opening,
+                finished=finished,
+                literate=literate,
+                last_fen=last_fen,
+                evals=evals,
+                since=since_by_username.get(username),
+                lazy=lazy,
+            )
+        )
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        games_by_username = dict(zip(usernames, executor.map(get_games, usernames)))
+    elapsed = time.perf_counter() - start
+
+    total_games = sum(len(games) for games in games_by_username.values())
+    games_per_second = total_games / elapsed if elapsed > 0 else 0
+    print(
+        f"DOWNLOADED {total_games} GAMES FOR {len(usernames)} USERS IN {elapsed:.2f}s ({games_per_second:.1f} GAMES/SEC)..."
+    )
+    return games_by_username
+
+
+def sync_games_for_users_v2(
+    game_store: GameStore,
+    usernames: list[str],
+    *,
+    max: int,
+    perf_type: PerfType,
+    max_workers: int,
+    base_url: Optional[str] = None,
+    rated: Optional[bool] = None,
+    tags: Optional[bool] = None,
+    opening: Optional[bool] = None,
+    finished: Optional[bool] = None,
+    literate: Optional[bool] = None,
+    last_fen: Optional[bool] = None,
+    evals: Optional[bool] = None,
+    lazy: bool = False,
+) -> tuple[dict[str, list[ChessGameV2]], dict[str, list[ChessGameV2]]]:
+    """
+    Downloads only the games newer than each user's newest stored game and saves them.
+    Returns (the last `max` games for each user, every game this sync downloaded for each user), both from the store.
+    A user with no stored games gets their newest `max` games.
+    A user with stored games is paged oldest first from the cursor until Lichess runs out of games,
+    so more than `max` games played between runs leave no gap in the store, or in the games returned as downloaded.
+    """
+    # lichess filters "since" on game creation, so the newest stored creation time is the cursor
+    # the game at the cursor will be downloaded again, which is fine since games are keyed by id
+    since_by_username = {
+        username: game_store.get_latest_created_at(username=username, perf_type=perf_type)
+        for username in usernames
+    }
+
+    def get_games(usernames: list[str], *, sort: Sort, since_by_username: dict[str, int]):
+        return get_games_for_users_v2(
+            usernames,
+            max_workers=min(max_workers, len(usernames)),
+            base_url=base_url,
+            since_by_username=since_by_username,
+            max=max,
+            rated=rated,
+            perf_type=perf_type,
+            tags=tags,
+            sort=sort,
+            opening=opening,
+            finished=finished,
+            literate=literate,
+            last_fen=last_fen,
+            evals=evals,
+            lazy=lazy,
+        )
+
+    # the store is only touched from this thread since sqlite connections are not shareable
+    new_usernames = [username for username in usernames if since_by_username[username] is None]
+    if new_usernames:
+        for new_games in get_games(
+            new_usernames, sort=Sort.DATE_DESC, since_by_username={}
+        ).values():
+            game_store.save_games(new_games)
+
+    cursors = {
+        username: since for username, since in since_by_username.items() if since is not None
+    }
+    while cursors:
+        pages = get_games(list(cursors), sort=Sort.DATE_ASC, since_by_username=cursors)
+        next_cursors = {}
+        for username, page in pages.items():
+            game_store.save_games(page)
+            if len(page) < max:
+                continue
+            # oldest first, so the last game is the newest one downloaded
+            next_cursor = page[-1].created_at
+            if next_cursor <= cursors[username]:
+                print(
+                    f"ALL {max} GAMES DOWNLOADED FOR {username} WERE CREATED AT {next_cursor}, SOME NEWER GAMES MAY BE MISSING..."
+                )
+                continue
+            print(
+                f"DOWNLOADED A FULL PAGE OF {max} GAMES FOR {username}, DOWNLOADING THE NEXT PAGE..."
+            )
+            next_cursors[username] = next_cursor
+        cursors = next_cursors
+
+    last_games_by_username = {
+        username: game_store.get_games(username=username, perf_type=perf_type, limit=max, lazy=lazy)
+        for username in usernames
+    }
+    # the game at the cursor is included again, stores fed these games skip the ones they already have
+    synced_games_by_username = {
+        username: game_store.get_games(
+            username=username, perf_type=perf_type, since=since_by_username[username], lazy=lazy
+        )
+        for username in usernames
+    }
+    return last_games_by_username, synced_games_by_username
@@ -1,11 +1,39 @@
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterator, Optional
 
 import chess
 from stockfish import Stockfish
 
+from engine.EvaluationBudget import EvaluationBudget, GameBudget
+from engine.StockfishPool import StockfishPool
+from engine.SyzygyTablebase import SyzygyTablebase
 from enumeration.ChessColor import ChessColor
 from model.ChessGameV2 import ChessGameV2
 from model.MoveEval import MoveEval
+from model.PlayedMove import PlayedMove
+from model.PositionAnalysis import PositionAnalysis
+from model.PositionTrie import PositionTrie, PositionTrieNode
+from store.EvaluationCache import EvaluationCache
+
+MATE_VALUE = -10_000
+
+
+def get_stockfish_path(stockfish_executable_name: str) -> str:
+    stockfish_relative_path = f"../bin/{stockfish_executable_name}"
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), stockfish_relative_path))
+
+
+def convert_raw_eval(raw_eval: dict, evaluate_for_white: bool) -> int:
+    """
+    Converts an evaluation in the format of Stockfish.get_evaluation() to a single score.
+    The score is positive if good and negative if bad for the evaluated color.
+    """
+    # we can either get centipawn or mate
+    if raw_eval["type"] == "mate":
+        return MATE_VALUE + abs(raw_eval["value"])
+    return raw_eval["value"] if evaluate_for_white else -raw_eval["value"]
 
 
 def get_worst_move_for_user(
@@ -15,68 +43,504 @@ def get_worst_move_for_user(
     evaluation_depth: int,
     stockfish_executable_name: str,
     stop_after_eval_change_of: int,
-) -> MoveEval:
+    stockfish_pool: Optional[StockfishPool] = None,
+    evaluation_cache: Optional[EvaluationCache] = None,
+    shallow_depth: Optional[int] = None,
+    shallow_swing_threshold: int = 0,
+    skip_opening_book: bool = False,
+    tablebase: Optional[SyzygyTablebase] = None,
+    evaluation_budget: Optional[EvaluationBudget] = None,
+    position_trie: Optional[PositionTrie] = None,
+) -> Optional[MoveEval]:
     """
     Returns the worst move from the given game for the user with the given username.
+    Returns None if none of the user's moves could be scored, e.g. the user made no moves.
+    If a StockfishPool is given, an engine is borrowed from it instead of starting a new one.
+    If an EvaluationCache is given, positions already evaluated at an equal or greater depth skip the engine.
+    If a shallow depth is given, every move is first scanned at that depth and only the moves
+    that lose at least `shallow_swing_threshold` centipawns (and the shallow worst move) are re-searched at full depth.
+    If skip_opening_book is True, the user's moves within the game's recognized opening are not scored.
+    If a SyzygyTablebase is given, positions with few enough pieces are looked up in it instead of searched.
+    If an EvaluationBudget is given, searches get shallower when the game falls behind its share of the budget,
+    and the worst move found so far is returned once the game's time is up.
+    If a PositionTrie is given, positions shared with other games in it are only evaluated once.
+    Games with Lichess server analysis that includes a best move for their worst move skip the engine entirely.
     """
+    worst_move_eval = get_worst_move_from_analysis(
+        chess_game=chess_game,
+        username=username,
+        stop_after_eval_change_of=stop_after_eval_change_of,
+    )
+    if worst_move_eval is not None and worst_move_eval.engine_best_move is not None:
+        if evaluation_budget is not None:
+            evaluation_budget.skip_game(
+                num_positions=get_num_positions_to_search(
+                    chess_game, username=username, skip_opening_book=skip_opening_book
+                )
+            )
+        return worst_move_eval
 
-    def convert_eval(ev: int, evaluate_for_white: bool) -> int:
-        # change to be a positive eval if good and negative eval if bad for both white and black
-        return ev if evaluate_for_white else -ev
+    if stockfish_pool is not None:
+        with stockfish_pool.engine() as stockfish:
+            return _get_worst_move_for_user_with_engine(
+                stockfish=stockfish,
+                chess_game=chess_game,
+                username=username,
+                evaluation_depth=evaluation_depth,
+                stop_after_eval_change_of=stop_after_eval_change_of,
+                evaluation_cache=evaluation_cache,
+                shallow_depth=shallow_depth,
+                shallow_swing_threshold=shallow_swing_threshold,
+                skip_opening_book=skip_opening_book,
+                tablebase=tablebase,
+                evaluation_budget=evaluation_budget,
+                position_trie=position_trie,
+            )
 
-    stockfish_relative_path = f"../bin/{stockfish_executable_name}"
-    stockfish_absolute_path = os.path.abspath(
-        os.path.join(os.path.dirname(__file__), stockfish_relative_path)
-    )
+    stockfish_absolute_path = get_stockfish_path(stockfish_executable_name)
     print(f"ATTEMPTING TO LOAD STOCKFISH FROM: '{stockfish_absolute_path}'")
     stockfish = Stockfish(stockfish_absolute_path)
     print(f"SUCCESSFULLY LOADED STOCKFISH")
+    return _get_worst_move_for_user_with_engine(
+        stockfish=stockfish,
+        chess_game=chess_game,
+        username=username,
+        evaluation_depth=evaluation_depth,
+        stop_after_eval_change_of=stop_after_eval_change_of,
+        evaluation_cache=evaluation_cache,
+        shallow_depth=shallow_depth,
+        shallow_swing_threshold=shallow_swing_threshold,
+        skip_opening_book=skip_opening_book,
+        tablebase=tablebase,
+        evaluation_budget=evaluation_budget,
+        position_trie=position_trie,
+    )
+
+
+def get_worst_moves_for_user(
+    *,
+    chess_games: list[ChessGameV2],
+    username: str,
+    evaluation_depth: int,
+    stop_after_eval_change_of: int,
+    stockfish_pool: StockfishPool,
+    evaluation_cache: Optional[EvaluationCache] = None,
+    shallow_depth: Optional[int] = None,
+    shallow_swing_threshold: int = 0,
+    skip_opening_book: bool = False,
+    tablebase: Optional[SyzygyTablebase] = None,
+    evaluation_budget: Optional[EvaluationBudget] = None,
+    position_trie: Optional[PositionTrie] = None,
+) -> list[Optional[MoveEval]]:
+    """
+    Returns the worst move from each of the given games, in the order the games were given.
+    Games are evaluated in parallel, one per engine in the pool.
+    The worst move is None for a game that could not be evaluated.
+    """
+    worst_moves: list[Optional[MoveEval]] = [None] * len(chess_games)
+    for i, worst_move in iter_worst_moves_for_user(
+        chess_games=chess_games,
+        username=username,
+        evaluation_depth=evaluation_depth,
+        stop_after_eval_change_of=stop_after_eval_change_of,
+        stockfish_pool=stockfish_pool,
+        evaluation_cache=evaluation_cache,
+        shallow_depth=shallow_depth,
+        shallow_swing_threshold=shallow_swing_threshold,
+        skip_opening_book=skip_opening_book,
+        tablebase=tablebase,
+        evaluation_budget=evaluation_budget,
+        position_trie=position_trie,
+    ):
+        worst_moves[i] = worst_move
+    return worst_moves
+
+
+def iter_worst_moves_for_user(
+    *,
+    chess_games: list[ChessGameV2],
+    username: str,
+    evaluation_depth: int,
+    stop_after_eval_change_of: int,
+    stockfish_pool: StockfishPool,
+    evaluation_cache: Optional[EvaluationCache] = None,
+    shallow_depth: Optional[int] = None,
+    shallow_swing_threshold: int = 0,
+    skip_opening_book: bool = False,
+    tablebase: Optional[SyzygyTablebase] = None,
+    evaluation_budget: Optional[EvaluationBudget] = None,
+    position_trie: Optional[PositionTrie] = None,
+) -> Iterator[tuple[int, MoveEval]]:
+    """
+    Evaluates the given games in parallel, one per engine in the pool.
+    Yields (index of game, worst move) as each game finishes.
+    A game that fails to evaluate, or has none of the user's moves to score, is logged and skipped, the other games carry on.
+    """
+
+    def evaluate(chess_game: ChessGameV2) -> Optional[MoveEval]:
+        worst_move_eval = get_worst_move_from_analysis(
+            chess_game=chess_game,
+            username=username,
+            stop_after_eval_change_of=stop_after_eval_change_of,
+        )
+        if worst_move_eval is not None and worst_move_eval.engine_best_move is not None:
+            if evaluation_budget is not None:
+                evaluation_budget.skip_game(
+                    num_positions=get_num_positions_to_search(
+                        chess_game, username=username, skip_opening_book=skip_opening_book
+                    )
+                )
+            return worst_move_eval
+        with stockfish_pool.engine() as stockfish:
+            return _get_worst_move_for_user_with_engine(
+                stockfish=stockfish,
+                chess_game=chess_game,
+                username=username,
+                evaluation_depth=evaluation_depth,
+                stop_after_eval_change_of=stop_after_eval_change_of,
+                evaluation_cache=evaluation_cache,
+                shallow_depth=shallow_depth,
+                shallow_swing_threshold=shallow_swing_threshold,
+                skip_opening_book=skip_opening_book,
+                tablebase=tablebase,
+                evaluation_budget=evaluation_budget,
+                position_trie=position_trie,
+            )
+
+    # each engine is its own process, so threads waiting on engine output are enough to use every core
+    with ThreadPoolExecutor(max_workers=stockfish_pool.size) as executor:
+        futures = {
+            executor.submit(evaluate, chess_game): i for i, chess_game in enumerate(chess_games)
+        }
+        try:
+            for num_evaluated, future in enumerate(as_completed(futures), start=1):
+                i = futures[future]
+                try:
+                    worst_move = future.result()
+                except Exception as e:
+                    print(
+                        f"FAILED TO EVALUATE GAME {chess_games[i].id} ({num_evaluated}/{len(chess_games)}): {e!r}"
+                    )
+                    continue
+                if worst_move is None:
+                    print(
+                        f"NO MOVES TO EVALUATE IN GAME {chess_games[i].id} ({num_evaluated}/{len(chess_games)})"
+                    )
+                    continue
+                print(f"EVALUATED GAME {num_evaluated}/{len(chess_games)}")
+                yield i, worst_move
+        finally:
+            # if the caller stops early, games that have not started yet are dropped
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _get_worst_move_for_user_with_engine(
+    *,
+    stockfish: Stockfish,
+    chess_game: ChessGameV2,
+    username: str,
+    evaluation_depth: int,
+    stop_after_eval_change_of: int,
+    evaluation_cache: Optional[EvaluationCache] = None,
+    shallow_depth: Optional[int] = None,
+    shallow_swing_threshold: int = 0,
+    skip_opening_book: bool = False,
+    tablebase: Optional[SyzygyTablebase] = None,
+    evaluation_budget: Optional[EvaluationBudget] = None,
+    position_trie: Optional[PositionTrie] = None,
+) -> Optional[MoveEval]:
+    evaluate_for_white = chess_game.color_for_user(username) == ChessColor.WHITE
+    path: Optional[list[PositionTrieNode]] = None
+    if position_trie is not None:
+        path = position_trie.get_path(chess_game)
+        user_moves = PositionTrie.get_played_moves(path, color=chess_game.color_for_user(username))
+    else:
+        user_moves = get_played_moves(chess_game, color=chess_game.color_for_user(username))
+    # the position the first scored move is compared against, None for the starting position
+    baseline_move: Optional[PlayedMove] = None
+    book_moves = [m for m in user_moves if m.ply <= chess_game.opening.ply]
+    if skip_opening_book and 0 < len(book_moves) < len(user_moves):
+        # book moves are never the worst move, so only the position after the last one is searched
+        baseline_move = book_moves[-1]
+        user_moves = user_moves[len(book_moves) :]
+    game_budget: Optional[GameBudget] = None
+    if evaluation_budget is not None:
+        # every user move, the baseline and the best move search, same as get_num_positions_to_search
+        game_budget = evaluation_budget.start_game(
+            num_positions=len(user_moves) + 2, max_depth=evaluation_depth
+        )
+    # clear the hash once per game, consecutive positions of the same game can then reuse it
+    stockfish.set_fen_position(chess.STARTING_FEN, send_ucinewgame_token=True)
+
+    def search(fen: str, depth: int) -> dict:
+        start = time.perf_counter()
+        raw_eval = _get_evaluation(
+            stockfish=stockfish,
+            fen=fen,
+            evaluation_depth=depth,
+            evaluation_cache=evaluation_cache,
+            tablebase=tablebase,
+        )
+        if game_budget is not None:
+            game_budget.record_search(depth=depth, seconds=time.perf_counter() - start)
+        return raw_eval
+
+    def evaluate(user_move: PlayedMove, depth: int) -> int:
+        """
+        Evaluates the position after the given move.
+        """
+        if game_budget is not None:
+            depth = game_budget.get_depth(depth)
+        if path is not None:
+            # positions shared with other games in the trie are only searched once
+            raw_eval = path[user_move.ply].get_evaluation(
+                depth, lambda: search(user_move.fen_after_move, depth)
+            )
+        else:
+            raw_eval = search(user_move.fen_after_move, depth)
+        return convert_raw_eval(raw_eval, evaluate_for_white)
+
+    def evaluate_before(i: int, depth: int) -> int:
+        if i > 0:
+            return evaluate(user_moves[i - 1], depth)
+        return evaluate(baseline_move, depth) if baseline_move is not None else 0
 
-    MATE_VALUE = -10_000
+    if shallow_depth is None or shallow_depth >= evaluation_depth:
+        move_evals = _get_move_evals(
+            user_moves=user_moves,
+            evaluate=lambda user_move: evaluate(user_move, evaluation_depth),
+            stop_after_eval_change_of=stop_after_eval_change_of,
+            initial_eval=evaluate_before(0, evaluation_depth),
+            game_budget=game_budget,
+        )
+    else:
+        # first pass: scan every move at a shallow depth
+        shallow_move_evals = _get_move_evals(
+            user_moves=user_moves,
+            evaluate=lambda user_move: evaluate(user_move, shallow_depth),
+            stop_after_eval_change_of=stop_after_eval_change_of,
+            initial_eval=evaluate_before(0, shallow_depth),
+            game_budget=game_budget,
+        )
+        if not shallow_move_evals:
+            return None
+        # second pass: re-search at full depth only the moves with a big enough shallow swing
+        candidate_indexes = {
+            i
+            for i, move_eval in enumerate(shallow_move_evals)
+            if move_eval.eval_change <= -shallow_swing_threshold
+        }
+        # the shallow worst move is always re-searched so there is at least one candidate
+        candidate_indexes.add(
+            min(range(len(shallow_move_evals)), key=lambda i: shallow_move_evals[i].eval_change)
+        )
+        if game_budget is not None:
+            # each candidate and the position before it are searched again at full depth
+            game_budget.add_positions(2 * len(candidate_indexes))
+        move_evals_by_index: dict[int, MoveEval] = {}
+        # worst candidates first, so running out of time only drops the least likely ones
+        for i in sorted(candidate_indexes, key=lambda i: shallow_move_evals[i].eval_change):
+            if move_evals_by_index and game_budget is not None and game_budget.is_out_of_time:
+                break
+            last_eval = evaluate_before(i, evaluation_depth)
+            current_eval = evaluate(user_moves[i], evaluation_depth)
+            move_evals_by_index[i] = MoveEval(
+                actual_move=user_moves[i].move,
+                eval_change=current_eval - last_eval,
+                fen_before_move=user_moves[i].fen_before_move,
+            )
+        move_evals = [move_evals_by_index[i] for i in sorted(move_evals_by_index)]
+
+    if not move_evals:
+        return None
+    sorted_move_evals = sorted(move_evals, key=lambda x: x.eval_change, reverse=False)
+    worst_move_eval = sorted_move_evals[0]
+    # only the worst move needs the engine's best move, so it is searched for once at the end
+    worst_move_eval.engine_best_move = _get_best_move(
+        stockfish=stockfish,
+        fen=worst_move_eval.fen_before_move,
+        evaluation_depth=(
+            game_budget.get_depth(evaluation_depth) if game_budget is not None else evaluation_depth
+        ),
+        evaluation_cache=evaluation_cache,
+    )
+    return worst_move_eval
+
+
+def get_worst_move_from_analysis(
+    *, chess_game: ChessGameV2, username: str, stop_after_eval_change_of: int
+) -> Optional[MoveEval]:
+    """
+    Returns the worst move from the given game for the user with the given username, using Lichess's server analysis.
+    Returns None if the game has no analysis, or the analysis is missing a score for one of the user's moves.
+    The engine's best move is Lichess's best move, which is only given for moves Lichess judged as inaccuracies or worse.
+    """
+    analysis = chess_game.analysis
+    if not analysis:
+        return None
+    color = chess_game.color_for_user(username)
+    user_moves = get_played_moves(chess_game, color=color)
+    # the analysis has one entry per ply, scoring the position after that ply
+    if not user_moves or any(
+        len(analysis) < m.ply or analysis[m.ply - 1].raw_eval is None for m in user_moves
+    ):
+        return None
+
+    move_evals = _get_move_evals(
+        user_moves=user_moves,
+        evaluate=lambda user_move: convert_raw_eval(
+            analysis[user_move.ply - 1].raw_eval, color == ChessColor.WHITE
+        ),
+        stop_after_eval_change_of=stop_after_eval_change_of,
+    )
+    worst_index = min(range(len(move_evals)), key=lambda i: move_evals[i].eval_change)
+    worst_move_eval = move_evals[worst_index]
+    worst_move_eval.engine_best_move = analysis[user_moves[worst_index].ply - 1].best
+    return worst_move_eval
+
+
+def get_num_positions_to_search(
+    chess_game: ChessGameV2, *, username: str, skip_opening_book: bool = False
+) -> int:
+    """
+    Returns how many positions evaluating the given game with the engine searches before any shallow second pass:
+    each of the user's scored moves, the position before the first one and the engine's best move.
+    Counted from the moves without replaying the game, for sizing the game's share of an EvaluationBudget.
+    """
+    num_plies = len(chess_game.moves.split(" "))
+    first_ply = 1 if chess_game.color_for_user(username) == ChessColor.WHITE else 2
+    user_plies = range(first_ply, num_plies + 1, 2)
+    num_book_moves = sum(1 for ply in user_plies if ply <= chess_game.opening.ply)
+    num_user_moves = len(user_plies)
+    if skip_opening_book and 0 < num_book_moves < num_user_moves:
+        num_user_moves -= num_book_moves
+    return num_user_moves + 2
+
+
+def get_played_moves(chess_game: ChessGameV2, *, color: ChessColor) -> list[PlayedMove]:
+    """
+    Replays the given game and returns every move played by the given color.
+    """
     board = chess.Board()
-    stockfish.set_depth(evaluation_depth)
+    played_moves = []
+    for ply, move in enumerate(chess_game.moves.split(" "), start=1):
+        fen_before_move = board.fen()
+        board.push_san(move)
+        if (color == ChessColor.WHITE) == (ply % 2 == 1):
+            played_moves.append(
+                PlayedMove(
+                    ply=ply,
+                    move=board.peek().uci(),
+                    fen_before_move=fen_before_move,
+                    fen_after_move=board.fen(),
+                )
+            )
+    return played_moves
 
+
+def _get_move_evals(
+    *,
+    user_moves: list[PlayedMove],
+    evaluate: Callable[[PlayedMove], int],
+    stop_after_eval_change_of: int,
+    initial_eval: int = 0,
+    game_budget: Optional[GameBudget] = None,
+) -> list[MoveEval]:
+    """
+    Scores each move by how much the evaluation changed since the user's previous move.
+    The first move is compared against initial_eval.
+    If the game budget runs out, the moves scored so far are returned.
+    """
     move_evals: list[MoveEval] = []
 
     worst_change = 0
-    best_move = None
-    last_eval = 0
+    last_eval = initial_eval
 
-    moves = chess_game.moves.split(" ")
-    evaluate_for_white = chess_game.color_for_user(username) == ChessColor.WHITE
-
-    white_turn = True
-    for move in moves:
+    for user_move in user_moves:
         if worst_change <= stop_after_eval_change_of:
             break
-        pre_move_fen = board.fen()
-        board.push_san(move)
-        fen = board.fen()
-        stockfish.set_fen_position(fen, send_ucinewgame_token=True)
-        # evaluate only for the color we want to evaluate for
-        if evaluate_for_white == white_turn:
-            raw_eval = stockfish.get_evaluation()
-            # we can either get centipawn or mate
-            if raw_eval["type"] == "mate":
-                current_eval = MATE_VALUE + abs(raw_eval["value"])
-            else:
-                current_eval = convert_eval(raw_eval["value"], evaluate_for_white)
-
-            current_change = current_eval - last_eval
-            move_eval = MoveEval(
-                actual_move=board.peek().uci(),
+        if move_evals and game_budget is not None and game_budget.is_out_of_time:
+            break
+        current_eval = evaluate(user_move)
+        current_change = current_eval - last_eval
+        move_evals.append(
+            MoveEval(
+                actual_move=user_move.move,
                 eval_change=current_change,
-                fen_before_move=pre_move_fen,
+                fen_before_move=user_move.fen_before_move,
             )
-            if current_change < worst_change:
-                worst_change = current_change
-                stockfish.set_fen_position(pre_move_fen, send_ucinewgame_token=True)
-                best_move = stockfish.get_best_move()
-                move_eval.engine_best_move = best_move
-            last_eval = current_eval
-            move_evals.append(move_eval)
+        )
+        if current_change < worst_change:
+            worst_change = current_change
+        last_eval = current_eval
 
-        white_turn = not white_turn
+    return move_evals
 
-    sorted_move_evals = sorted(move_evals, key=lambda x: x.eval_change, reverse=False)
-    return sorted_move_evals[0]
+
+def _get_evaluation(
+    *,
+    stockfish: Stockfish,
+    fen: str,
+    evaluation_depth: int,
+    evaluation_cache: Optional[EvaluationCache],
+    tablebase: Optional[SyzygyTablebase] = None,
+) -> dict:
+    if tablebase is not None:
+        tablebase_eval = tablebase.get_evaluation(fen)
+        if tablebase_eval is not None:
+            return tablebase_eval
+    if evaluation_cache is not None:
+        cached_eval = evaluation_cache.get_evaluation(fen, evaluation_depth)
+        if cached_eval is not None:
+            return cached_eval
+    stockfish.set_depth(evaluation_depth)
+    stockfish.set_fen_position(fen, send_ucinewgame_token=False)
+    raw_eval = stockfish.get_evaluation()
+    if evaluation_cache is not None:
+        evaluation_cache.put_evaluation(fen, evaluation_depth, raw_eval)
+    return raw_eval
+
+
+def analyse_position(
+    *, stockfish: Stockfish, fen: str, num_lines: int = 1, send_ucinewgame_token: bool = False
+) -> PositionAnalysis:
+    """
+    Gets the evaluation, best move and top `num_lines` lines of the given position from a single search.
+    Leave send_ucinewgame_token off for consecutive positions of one game so the engine's hash stays warm.
+    """
+    stockfish.set_fen_position(fen, send_ucinewgame_token=send_ucinewgame_token)
+    lines = stockfish.get_top_moves(num_lines)
+    if not lines:
+        # no legal moves, so the position is either checkmate or stalemate
+        board = chess.Board(fen)
+        evaluation = (
+            {"type": "mate", "value": 0} if board.is_checkmate() else {"type": "cp", "value": 0}
+        )
+        return PositionAnalysis(evaluation=evaluation, best_move=None)
+
+    best_line = lines[0]
+    if best_line["Mate"] is not None:
+        evaluation = {"type": "mate", "value": best_line["Mate"]}
+    else:
+        evaluation = {"type": "cp", "value": best_line["Centipawn"]}
+    return PositionAnalysis(evaluation=evaluation, best_move=best_line["Move"], lines=lines)
+
+
+def _get_best_move(
+    *,
+    stockfish: Stockfish,
+    fen: str,
+    evaluation_depth: int,
+    evaluation_cache: Optional[EvaluationCache],
+) -> Optional[str]:
+    if evaluation_cache is not None:
+        cached_best_move = evaluation_cache.get_best_move(fen, evaluation_depth)
+        if cached_best_move is not None:
+            return cached_best_move
+    stockfish.set_depth(evaluation_depth)
+    analysis = analyse_position(stockfish=stockfish, fen=fen)
+    if evaluation_cache is not None and analysis.best_move is not None:
+        # the same search also evaluated the position, so cache that too
+        evaluation_cache.put_evaluation(fen, evaluation_depth, analysis.evaluation)
+        evaluation_cache.put_best_move(fen, evaluation_depth, analysis.best_move)
+    return analysis.best_move
@@ -0,0 +1,165 @@
+import asyncio
+from typing import Callable, Optional
+
+import chess
+import chess.engine
+
+from enumeration.ChessColor import ChessColor
+from model.ChessGameV2 import ChessGameV2
+from model.MoveEval import MoveEval
+from service.evaluate_game import convert_raw_eval, get_worst_move_from_analysis
+
+
+async def get_worst_moves_for_user_async(
+    *,
+    chess_games: list[ChessGameV2],
+    username: str,
+    stockfish_path: str,
+    limit: chess.engine.Limit,
+    stop_after_eval_change_of: int,
+    num_engines: int = 1,
+    on_info: Optional[Callable[[ChessGameV2, chess.engine.InfoDict], None]] = None,
+) -> list[Optional[MoveEval]]:
+    """
+    Returns the worst move from each of the given games, in the order the games were given.
+    Starts `num_engines` UCI engines and analyses up to that many games concurrently from one event loop.
+    If on_info is given, it is called with every info update the engines stream while searching.
+    The worst move is None for a game that could not be evaluated, the other games carry on.
+    """
+    engines: asyncio.Queue[chess.engine.UciProtocol] = asyncio.Queue()
+    num_started = 0
+
+    async def evaluate(chess_game: ChessGameV2) -> Optional[MoveEval]:
+        worst_move_eval = get_worst_move_from_analysis(
+            chess_game=chess_game,
+            username=username,
+            stop_after_eval_change_of=stop_after_eval_change_of,
+        )
+        if worst_move_eval is not None and worst_move_eval.engine_best_move is not None:
+            return worst_move_eval
+        engine = await engines.get()
+        try:
+            return await get_worst_move_for_user_async(
+                chess_game=chess_game,
+                username=username,
+                engine=engine,
+                limit=limit,
+                stop_after_eval_change_of=stop_after_eval_change_of,
+                on_info=on_info,
+            )
+        finally:
+            engines.put_nowait(engine)
+
+    try:
+        # started inside the try, so the engines already running are quit if a later one fails to start
+        print(f"STARTING {num_engines} UCI ENGINE(S) FROM: '{stockfish_path}'")
+        for _ in range(num_engines):
+            _, engine = await chess.engine.popen_uci(stockfish_path)
+            engines.put_nowait(engine)
+            num_started += 1
+        results = await asyncio.gather(
+            *(evaluate(chess_game) for chess_game in chess_games), return_exceptions=True
+        )
+    finally:
+        for _ in range(num_started):
+            engine = await engines.get()
+            try:
+                await engine.quit()
+            except chess.engine.EngineError:
+                # an engine that crashed while evaluating a game has already exited
+                pass
+
+    worst_moves: list[Optional[MoveEval]] = []
+    for chess_game, result in zip(chess_games, results):
+        if isinstance(result, BaseException):
+            print(f"FAILED TO EVALUATE GAME {chess_game.id}: {result!r}")
+            worst_moves.append(None)
+        else:
+            worst_moves.append(result)
+    return worst_moves
+
+
+async def get_worst_move_for_user_async(
+    *,
+    chess_game: ChessGameV2,
+    username: str,
+    engine: chess.engine.UciProtocol,
+    limit: chess.engine.Limit,
+    stop_after_eval_change_of: int,
+    on_info: Optional[Callable[[ChessGameV2, chess.engine.InfoDict], None]] = None,
+) -> Optional[MoveEval]:
+    """
+    Returns the worst move from the given game for the user with the given username.
+    Gives the same result as get_worst_move_for_user, using a python-chess UCI engine.
+    Returns None if none of the user's moves could be scored.
+    """
+
+    async def analyse(board: chess.Board) -> chess.engine.InfoDict:
+        # passing the game id means ucinewgame is only sent when moving on to another game
+        with await engine.analysis(board, limit, game=chess_game.id) as analysis:
+            async for info in analysis:
+                if on_info is not None:
+                    on_info(chess_game, info)
+            return analysis.info
+
+    board = chess.Board()
+
+    move_evals: list[MoveEval] = []
+
+    worst_change = 0
+    last_eval = 0
+
+    moves = chess_game.moves.split(" ")
+    evaluate_for_white = chess_game.color_for_user(username) == ChessColor.WHITE
+
+    white_turn = True
+    for move in moves:
+        if worst_change <= stop_after_eval_change_of:
+            break
+        pre_move_fen = board.fen()
+        board.push_san(move)
+        # evaluate only for the color we want to evaluate for
+        if evaluate_for_white == white_turn:
+            score = (await analyse(board)).get("score")
+            if score is None:
+                # the engine can finish a search without reporting a score, skip the move
+                white_turn = not white_turn
+                continue
+            current_eval = convert_raw_eval(_to_raw_eval(score), evaluate_for_white)
+            current_change = current_eval - last_eval
+            move_evals.append(
+                MoveEval(
+                    actual_move=board.peek().uci(),
+                    eval_change=current_change,
+                    fen_before_move=pre_move_fen,
+                )
+            )
+            if current_change < worst_change:
+                worst_change = current_change
+            last_eval = current_eval
+
+        white_turn = not white_turn
+
+    if not move_evals:
+        return None
+    sorted_move_evals = sorted(move_evals, key=lambda x: x.eval_change, reverse=False)
+    worst_move_eval = sorted_move_evals[0]
+    board = chess.Board(worst_move_eval.fen_before_move)
+    info = await analyse(board)
+    if info.get("pv"):
+        worst_move_eval.engine_best_move = info["pv"][0].uci()
+    else:
+        # the search ended without a principal variation, ask the engine for its move instead
+        result = await engine.play(board, limit, game=chess_game.id)
+        worst_move_eval.engine_best_move = result.move.uci() if result.move is not None else None
+    return worst_move_eval
+
+
+def _to_raw_eval(score: chess.engine.PovScore) -> dict:
+    """
+    Converts a python-chess score to the format of Stockfish.get_evaluation().
+    """
+    white_score = score.white()
+    if white_score.is_mate():
+        return {"type": "mate", "value": white_score.mate()}
+    return {"type": "cp", "value": white_score.score()}
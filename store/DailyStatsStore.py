@@ -0,0 +1,135 @@
+import sqlite3
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from enumeration.ChessColor import ChessColor
+from enumeration.PerfType import PerfType
+from model.ChessGameV2 import ChessGameV2
+from model.GameCollection import GameCollection
+from model.OpeningStats import OpeningStats
+from model.UserGameStats import COLORS, LOSS_CODE, WIN_CODE
+
+
+class DailyStatsStore:
+    """
+    Local SQLite-backed totals of a user's games per day, perf type, opening and color.
+    Games are merged into the totals once each, so stats over the last N days are a sum of at most N days of rows
+    instead of a scan over the games themselves.
+    """
+
+    def __init__(self, database_path: str):
+        self.__connection = sqlite3.connect(database_path)
+        with self.__connection:
+            self.__connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS daily_stats (
+                    user_id TEXT NOT NULL,
+                    perf TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    opening TEXT NOT NULL,
+                    color TEXT NOT NULL,
+                    games INTEGER NOT NULL,
+                    wins INTEGER NOT NULL,
+                    losses INTEGER NOT NULL,
+                    ties INTEGER NOT NULL,
+                    net_elo INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, perf, day, opening, color)
+                )
+                """
+            )
+            # the games already merged into daily_stats, so a game fetched twice is only counted once
+            self.__connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS daily_stats_games (
+                    user_id TEXT NOT NULL,
+                    game_id TEXT NOT NULL,
+                    PRIMARY KEY (user_id, game_id)
+                )
+                """
+            )
+
+    def close(self) -> None:
+        self.__connection.close()
+
+    def add_games(self, *, username: str, games: Iterable[ChessGameV2]) -> int:
+        """
+        Merges the games that have not been merged before into the daily totals.
+        Returns the number of games merged.
+        """
+        user_id = username.lower()
+        game_collection = GameCollection.from_games(games, username=username)
+        stats = game_collection.stats
+        # (perf, day, opening, color) -> [games, wins, losses, ties, net elo]
+        totals = defaultdict(lambda: [0, 0, 0, 0, 0])
+        with self.__connection:
+            for i, game in enumerate(game_collection):
+                cursor = self.__connection.execute(
+                    "INSERT OR IGNORE INTO daily_stats_games VALUES (?, ?)", (user_id, game.id)
+                )
+                if cursor.rowcount == 0:
+                    continue
+                total = totals[
+                    (
+                        game.perf,
+                        game.last_move_day.isoformat(),
+                        stats.openings[stats.opening_codes[i]].name,
+                        COLORS[stats.colors[i]].value,
+                    )
+                ]
+                total[0] += 1
+                outcome = stats.outcomes[i]
+                if outcome == WIN_CODE:
+                    total[1] += 1
+                elif outcome == LOSS_CODE:
+                    total[2] += 1
+                else:
+                    total[3] += 1
+                total[4] += stats.rating_diffs[i]
+
+            self.__connection.executemany(
+                """
+                INSERT INTO daily_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (user_id, perf, day, opening, color) DO UPDATE SET
+                    games = games + excluded.games,
+                    wins = wins + excluded.wins,
+                    losses = losses + excluded.losses,
+                    ties = ties + excluded.ties,
+                    net_elo = net_elo + excluded.net_elo
+                """,
+                [(user_id, *key, *total) for key, total in totals.items()],
+            )
+        return sum(total[0] for total in totals.values())
+
+    def get_opening_stats(
+        self, *, username: str, perf_type: PerfType, days: int, end_day: Optional[date] = None
+    ) -> list[OpeningStats]:
+        """
+        Returns the totals per opening and color over the given number of days up to and including end_day (default today, UTC).
+        Sorted from worst to best net elo.
+        """
+        if end_day is None:
+            end_day = datetime.now(timezone.utc).date()
+        start_day = end_day - timedelta(days=days - 1)
+        rows = self.__connection.execute(
+            """
+            SELECT opening, color, SUM(games), SUM(wins), SUM(losses), SUM(ties), SUM(net_elo)
+            FROM daily_stats
+            WHERE user_id = ? AND perf = ? AND day BETWEEN ? AND ?
+            GROUP BY opening, color
+            ORDER BY SUM(net_elo), opening, color
+            """,
+            (username.lower(), perf_type.value, start_day.isoformat(), end_day.isoformat()),
+        )
+        return [
+            OpeningStats(
+                opening_name=opening,
+                player_color=ChessColor.from_str(color),
+                games=games,
+                wins=wins,
+                losses=losses,
+                ties=ties,
+                net_elo=net_elo,
+            )
+            for opening, color, games, wins, losses, ties, net_elo in rows
+        ]
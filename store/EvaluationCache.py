@@ -0,0 +1,123 @@
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Optional
+
+from model.EvaluationCacheStats import EvaluationCacheStats
+
+EVALUATION_KIND = "evaluation"
+BEST_MOVE_KIND = "best_move"
+
+
+class EvaluationCache:
+    """
+    Caches engine results by position, keyed by FEN without the move counters.
+    Lookups check an in-memory LRU first, then a SQLite table on disk if a database path is given.
+    A result is reused for any request at the same or a lower depth.
+    """
+
+    def __init__(self, *, database_path: Optional[str] = None, max_memory_entries: int = 100_000):
+        self.__max_memory_entries = max_memory_entries
+        self.__memory: OrderedDict[tuple[str, str], tuple[int, any]] = OrderedDict()
+        self.__stats = EvaluationCacheStats()
+        # evaluations may run on several threads at once
+        self.__lock = threading.Lock()
+        self.__connection = None
+        if database_path is not None:
+            self.__connection = sqlite3.connect(database_path, check_same_thread=False)
+            with self.__connection:
+                self.__connection.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS evaluations (
+                        fen TEXT NOT NULL,
+                        kind TEXT NOT NULL,
+                        depth INTEGER NOT NULL,
+                        value TEXT NOT NULL,
+                        PRIMARY KEY (fen, kind)
+                    )
+                    """
+                )
+
+    def close(self) -> None:
+        if self.__connection is not None:
+            self.__connection.close()
+
+    def get_evaluation(self, fen: str, depth: int) -> Optional[dict]:
+        """
+        Returns a cached evaluation in the format of Stockfish.get_evaluation().
+        """
+        return self.__get(fen, EVALUATION_KIND, depth)
+
+    def put_evaluation(self, fen: str, depth: int, evaluation: dict) -> None:
+        self.__put(fen, EVALUATION_KIND, depth, evaluation)
+
+    def get_best_move(self, fen: str, depth: int) -> Optional[str]:
+        return self.__get(fen, BEST_MOVE_KIND, depth)
+
+    def put_best_move(self, fen: str, depth: int, best_move: str) -> None:
+        self.__put(fen, BEST_MOVE_KIND, depth, best_move)
+
+    def get_stats(self) -> EvaluationCacheStats:
+        with self.__lock:
+            return replace(self.__stats)
+
+    def reset_stats(self) -> None:
+        with self.__lock:
+            self.__stats = EvaluationCacheStats()
+
+    @staticmethod
+    def normalize_fen(fen: str) -> str:
+        """
+        Drops the halfmove clock and fullmove number, which do not change the evaluation.
+        """
+        return " ".join(fen.split(" ")[:4])
+
+    def __get(self, fen: str, kind: str, depth: int) -> Optional[any]:
+        key = (self.normalize_fen(fen), kind)
+        with self.__lock:
+            cached = self.__memory.get(key)
+            if cached is not None and cached[0] >= depth:
+                self.__memory.move_to_end(key)
+                self.__stats.memory_hits += 1
+                return cached[1]
+
+            if self.__connection is not None:
+                row = self.__connection.execute(
+                    "SELECT depth, value FROM evaluations WHERE fen = ? AND kind = ? AND depth >= ?",
+                    (*key, depth),
+                ).fetchone()
+                if row is not None:
+                    cached_depth, value = row[0], json.loads(row[1])
+                    self.__remember(key, cached_depth, value)
+                    self.__stats.disk_hits += 1
+                    return value
+
+            self.__stats.misses += 1
+            return None
+
+    def __put(self, fen: str, kind: str, depth: int, value: any) -> None:
+        key = (self.normalize_fen(fen), kind)
+        with self.__lock:
+            cached = self.__memory.get(key)
+            if cached is None or cached[0] <= depth:
+                self.__remember(key, depth, value)
+
+            if self.__connection is not None:
+                with self.__connection:
+                    # only ever replace a result with one from an equal or deeper search
+                    self.__connection.execute(
+                        """
+                        INSERT INTO evaluations (fen, kind, depth, value) VALUES (?, ?, ?, ?)
+                        ON CONFLICT (fen, kind) DO UPDATE SET depth = excluded.depth, value = excluded.value
+                        WHERE excluded.depth >= evaluations.depth
+                        """,
+                        (*key, depth, json.dumps(value)),
+                    )
+
+    def __remember(self, key: tuple[str, str], depth: int, value: any) -> None:
+        self.__memory[key] = (depth, value)
+        self.__memory.move_to_end(key)
+        if len(self.__memory) > self.__max_memory_entries:
+            self.__memory.popitem(last=False)
@@ -0,0 +1,96 @@
+import json
+import sqlite3
+from typing import Optional
+
+from enumeration.PerfType import PerfType
+from model.ChessGameV2 import ChessGameV2
+
+
+class GameStore:
+    """
+    Local SQLite-backed store of Lichess games keyed by game id.
+    """
+
+    def __init__(self, database_path: str):
+        self.__connection = sqlite3.connect(database_path)
+        with self.__connection:
+            self.__connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS games (
+                    id TEXT PRIMARY KEY,
+                    white_id TEXT NOT NULL,
+                    black_id TEXT NOT NULL,
+                    perf TEXT NOT NULL,
+                    created_at INTEGER NOT NULL,
+                    last_move_at INTEGER NOT NULL,
+                    data TEXT NOT NULL
+                )
+                """
+            )
+            self.__connection.execute(
+                "CREATE INDEX IF NOT EXISTS games_perf_created_at ON games (perf, created_at)"
+            )
+
+    def close(self) -> None:
+        self.__connection.close()
+
+    def save_games(self, games: list[ChessGameV2]) -> None:
+        """
+        Inserts the given games, replacing any stored game with the same id.
+        """
+        with self.__connection:
+            self.__connection.executemany(
+                "INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        game.id,
+                        game.players.white.user.id,
+                        game.players.black.user.id,
+                        game.perf,
+                        game.created_at,
+                        game.last_move_at,
+                        json.dumps(game.to_dict()),
+                    )
+                    for game in games
+                ],
+            )
+
+    def get_latest_created_at(self, *, username: str, perf_type: PerfType) -> Optional[int]:
+        """
+        Returns the creation timestamp (ms) of the newest stored game for the given user.
+        Returns None if no games are stored for the user.
+        """
+        user_id = username.lower()
+        (latest_created_at,) = self.__connection.execute(
+            "SELECT MAX(created_at) FROM games WHERE perf = ? AND ? IN (white_id, black_id)",
+            (perf_type.value, user_id),
+        ).fetchone()
+        return latest_created_at
+
+    def get_games(
+        self,
+        *,
+        username: str,
+        perf_type: PerfType,
+        limit: Optional[int] = None,
+        since: Optional[int] = None,
+        lazy: bool = False,
+    ) -> list[ChessGameV2]:
+        """
+        Returns the stored games for the given user, newest first.
+        If since is given, only the games created at or after that timestamp (ms) are returned.
+        """
+        user_id = username.lower()
+        query = "SELECT data FROM games WHERE perf = ? AND ? IN (white_id, black_id)"
+        params = [perf_type.value, user_id]
+        if since is not None:
+            query += " AND created_at >= ?"
+            params.append(since)
+        query += " ORDER BY created_at DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [
+            ChessGameV2.from_dict(json.loads(data), lazy=lazy)
+            for (data,) in self.__connection.execute(query, params)
+        ]
@@ -0,0 +1,185 @@
+import sqlite3
+from datetime import date, timedelta
+from typing import Iterable, Optional
+
+from enumeration.PerfType import PerfType
+from enumeration.RatingPeriod import RatingPeriod
+from model.ChessGameV2 import ChessGameV2
+from model.GameCollection import GameCollection
+from model.RatingRollup import RatingRollup
+
+SELECT_ROLLUPS = "SELECT start_day, min_rating, max_rating, close_rating, num_games FROM rating_rollups WHERE user_id = ? AND perf = ? AND period = ?"
+
+
+class RatingHistoryStore:
+    """
+    Local SQLite-backed history of a user's rating, one point per game.
+    Daily and weekly min/max/close rollups are updated as points are added,
+    so rating graphs and peaks over any stretch of history are read from the rollups instead of the points.
+    """
+
+    def __init__(self, database_path: str):
+        self.__connection = sqlite3.connect(database_path)
+        with self.__connection:
+            # keyed by time so a user's points are stored in order
+            self.__connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS rating_points (
+                    user_id TEXT NOT NULL,
+                    perf TEXT NOT NULL,
+                    last_move_at INTEGER NOT NULL,
+                    game_id TEXT NOT NULL,
+                    rating INTEGER NOT NULL,
+                    rating_after_game INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, perf, last_move_at, game_id)
+                ) WITHOUT ROWID
+                """
+            )
+            self.__connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS rating_rollups (
+                    user_id TEXT NOT NULL,
+                    perf TEXT NOT NULL,
+                    period TEXT NOT NULL,
+                    start_day TEXT NOT NULL,
+                    min_rating INTEGER NOT NULL,
+                    max_rating INTEGER NOT NULL,
+                    close_rating INTEGER NOT NULL,
+                    close_at INTEGER NOT NULL,
+                    num_games INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, perf, period, start_day)
+                ) WITHOUT ROWID
+                """
+            )
+
+    def close(self) -> None:
+        self.__connection.close()
+
+    def add_games(self, *, username: str, games: Iterable[ChessGameV2]) -> int:
+        """
+        Adds a rating point for each game that has not been added before and rolls it up into its day and week.
+        Returns the number of points added.
+        """
+        user_id = username.lower()
+        game_collection = GameCollection.from_games(games, username=username)
+        stats = game_collection.stats
+        # (perf, period, start day) -> [min rating, max rating, close rating, close at, games]
+        rollups: dict[tuple[str, str, str], list[int]] = {}
+        with self.__connection:
+            for i, game in enumerate(game_collection):
+                rating = stats.ratings[i]
+                rating_after_game = rating + stats.rating_diffs[i]
+                cursor = self.__connection.execute(
+                    "INSERT OR IGNORE INTO rating_points VALUES (?, ?, ?, ?, ?, ?)",
+                    (user_id, game.perf, game.last_move_at, game.id, rating, rating_after_game),
+                )
+                if cursor.rowcount == 0:
+                    continue
+                day = game.last_move_day
+                for period in RatingPeriod:
+                    key = (game.perf, period.value, self.get_period_start(day, period).isoformat())
+                    rollup = rollups.get(key)
+                    if rollup is None:
+                        rollups[key] = [
+                            min(rating, rating_after_game),
+                            max(rating, rating_after_game),
+                            rating_after_game,
+                            game.last_move_at,
+                            1,
+                        ]
+                        continue
+                    rollup[0] = min(rollup[0], rating, rating_after_game)
+                    rollup[1] = max(rollup[1], rating, rating_after_game)
+                    if game.last_move_at >= rollup[3]:
+                        rollup[2], rollup[3] = rating_after_game, game.last_move_at
+                    rollup[4] += 1
+
+            # games can be added out of order, the close is the rating after the latest game
+            self.__connection.executemany(
+                """
+                INSERT INTO rating_rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (user_id, perf, period, start_day) DO UPDATE SET
+                    min_rating = MIN(min_rating, excluded.min_rating),
+                    max_rating = MAX(max_rating, excluded.max_rating),
+                    close_rating = CASE
+                        WHEN excluded.close_at >= close_at THEN excluded.close_rating
+                        ELSE close_rating
+                    END,
+                    close_at = MAX(close_at, excluded.close_at),
+                    num_games = num_games + excluded.num_games
+                """,
+                [(user_id, *key, *rollup) for key, rollup in rollups.items()],
+            )
+        return sum(
+            rollup[4]
+            for (_, period, _), rollup in rollups.items()
+            if period == RatingPeriod.DAY.value
+        )
+
+    def get_rollups(
+        self,
+        *,
+        username: str,
+        perf_type: PerfType,
+        period: RatingPeriod,
+        start_day: Optional[date] = None,
+        end_day: Optional[date] = None,
+    ) -> list[RatingRollup]:
+        """
+        Returns the rollups from the period containing start_day to the one containing end_day, oldest first.
+        Leaving out start_day or end_day leaves that end of the range open.
+        """
+        query = SELECT_ROLLUPS
+        params = [username.lower(), perf_type.value, period.value]
+        if start_day is not None:
+            query += " AND start_day >= ?"
+            params.append(self.get_period_start(start_day, period).isoformat())
+        if end_day is not None:
+            query += " AND start_day <= ?"
+            params.append(self.get_period_start(end_day, period).isoformat())
+        query += " ORDER BY start_day"
+        return [self.__to_rating_rollup(row) for row in self.__connection.execute(query, params)]
+
+    def get_peak(
+        self,
+        *,
+        username: str,
+        perf_type: PerfType,
+        start_day: Optional[date] = None,
+        end_day: Optional[date] = None,
+    ) -> Optional[RatingRollup]:
+        """
+        Returns the day with the highest rating between start_day and end_day, the earliest if several tie.
+        Returns None if there are no ratings in that range.
+        """
+        query = SELECT_ROLLUPS
+        params = [username.lower(), perf_type.value, RatingPeriod.DAY.value]
+        if start_day is not None:
+            query += " AND start_day >= ?"
+            params.append(start_day.isoformat())
+        if end_day is not None:
+            query += " AND start_day <= ?"
+            params.append(end_day.isoformat())
+        query += " ORDER BY max_rating DESC, start_day LIMIT 1"
+        row = self.__connection.execute(query, params).fetchone()
+        return None if row is None else self.__to_rating_rollup(row)
+
+    @staticmethod
+    def __to_rating_rollup(row: tuple) -> RatingRollup:
+        start_day, min_rating, max_rating, close_rating, num_games = row
+        return RatingRollup(
+            start_day=date.fromisoformat(start_day),
+            min_rating=min_rating,
+            max_rating=max_rating,
+            close_rating=close_rating,
+            num_games=num_games,
+        )
+
+    @staticmethod
+    def get_period_start(day: date, period: RatingPeriod) -> date:
+        """
+        Returns the first day of the period containing the given day, weeks start on Monday.
+        """
+        if period == RatingPeriod.WEEK:
+            return day - timedelta(days=day.weekday())
+        return day
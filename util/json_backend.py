@@ -0,0 +1,21 @@
+"""
+Picks the fastest installed JSON parser.
+orjson and msgspec are optional, the stdlib json module is used if neither is installed.
+Every backend's loads accepts raw bytes, so NDJSON lines never need to be decoded to str first.
+"""
+import json
+
+try:
+    import orjson
+
+    JSON_BACKEND = "orjson"
+    loads = orjson.loads
+except ImportError:
+    try:
+        import msgspec
+
+        JSON_BACKEND = "msgspec"
+        loads = msgspec.json.decode
+    except ImportError:
+        JSON_BACKEND = "json"
+        loads = json.loads